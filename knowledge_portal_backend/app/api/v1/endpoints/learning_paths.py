@@ -2,10 +2,15 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Security, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import deps
+from app.core.cache_warmer import cache_warmer
+from app.core.database import AsyncSessionLocal
 from app.crud.learning_path import learning_path_crud
 from app.crud.skill import skill_crud
 from app.crud.video import video_crud
+from app.models.learning_path import LearningPath
 from app.models.user import User
+from app.models.video import Video
+from app.repositories.base import BaseRepository
 from app.schemas.learning_path import (
     LearningPathCreate,
     LearningPathResponse,
@@ -13,11 +18,58 @@ from app.schemas.learning_path import (
     LearningPathGenerateRequest
 )
 from app.schemas.skill import SkillBase
+from app.schemas.video import Video as VideoSchema
+from app.services.base import BaseService
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+async def warm_video(video_id: str):
+    """Cache warmer hook: load a popular video into the "video:{id}" cache"""
+    async with AsyncSessionLocal() as session:
+        # Not a read: counting it would keep warmed videos popular forever
+        await BaseService(BaseRepository(Video, session), cache_prefix="video").get(int(video_id), record=False)
+
+cache_warmer.register("video", warm_video)
+
+async def hydrate_learning_paths(
+    db: AsyncSession,
+    learning_paths: List[LearningPath]
+) -> List[LearningPathResponse]:
+    """
+    Build learning path responses, fetching every referenced video with one
+    cache round trip (and one query for cache misses) instead of one per video.
+    """
+    video_ids_by_path = await learning_path_crud.get_video_ids(
+        db, learning_path_ids=[path.id for path in learning_paths]
+    )
+    all_video_ids = list(dict.fromkeys(
+        video_id for video_ids in video_ids_by_path.values() for video_id in video_ids
+    ))
+    video_service = BaseService(BaseRepository(Video, db), cache_prefix="video")
+    videos = {video.id: video for video in await video_service.get_many(all_video_ids)}
+
+    return [
+        LearningPathResponse(
+            id=path.id,
+            user_id=path.user_id,
+            title=path.title,
+            description=path.description,
+            difficulty_level=path.difficulty_level,
+            estimated_hours=path.estimated_hours,
+            created_at=path.created_at,
+            updated_at=path.updated_at,
+            skills=[SkillBase(name=skill.name, description=skill.description) for skill in path.skills],
+            videos=[
+                VideoSchema.model_validate(videos[video_id])
+                for video_id in video_ids_by_path[path.id]
+                if video_id in videos
+            ]
+        )
+        for path in learning_paths
+    ]
+
 @router.post("/", response_model=LearningPathResponse)
 async def create_learning_path(
     learning_path: LearningPathCreate,
@@ -40,7 +92,8 @@ async def list_learning_paths(
     """
     Retrieve all learning paths with pagination.
     """
-    return await learning_path_crud.get_multi(db, skip=skip, limit=limit)
+    learning_paths = await learning_path_crud.get_multi_with_skills(db, skip=skip, limit=limit)
+    return await hydrate_learning_paths(db, learning_paths)
 
 @router.get("/{learning_path_id}", response_model=LearningPathResponse)
 async def get_learning_path(
@@ -51,10 +104,10 @@ async def get_learning_path(
     """
     Get a specific learning path by ID.
     """
-    learning_path = await learning_path_crud.get(db, id=learning_path_id)
+    learning_path = await learning_path_crud.get_with_skills(db, id=learning_path_id)
     if not learning_path:
         raise HTTPException(status_code=404, detail="Learning path not found")
-    return learning_path
+    return (await hydrate_learning_paths(db, [learning_path]))[0]
 
 @router.put("/{learning_path_id}", response_model=LearningPathResponse)
 async def update_learning_path(
@@ -7,6 +7,7 @@ from sqlalchemy import select
 from app.core.redis_client import redis_client
 from app.core.elasticsearch_client import es_client
 from app.core.deps import get_db
+from app.core.response_cache import cache_key, cached_response, prime_response
 from app.models.quiz import Quiz as QuizModel
 from app.models.quiz_attempt import QuizAttempt
 from datetime import datetime
@@ -80,6 +81,12 @@ class QuizListResponse(BaseModel):
     time_limit: int
 
 @router.get("/available", response_model=List[QuizListResponse])
+@cached_response(
+    cache_key("available_quizzes", "skip", "limit"),
+    soft_ttl=3600,
+    hard_ttl=86400,
+    tags=["quiz"]  # Invalidated whenever a quiz is created, updated or deleted
+)
 async def list_available_quizzes(
     skip: int = 0,
     limit: int = 10,
@@ -88,13 +95,6 @@ async def list_available_quizzes(
     """
     List all available quizzes with pagination.
     """
-    # Try to get cached quizzes
-    cache_key = f"available_quizzes:{skip}:{limit}"
-    cached_quizzes = await redis_client.get_json(cache_key)
-    
-    if cached_quizzes:
-        return cached_quizzes
-    
     try:
         # Query all quizzes with pagination
         query = select(QuizModel).offset(skip).limit(limit)
@@ -115,28 +115,23 @@ async def list_available_quizzes(
             for quiz in quizzes
         ]
         
-        # Cache the results for 5 minutes
-        await redis_client.set_json(cache_key, [quiz.dict() for quiz in quiz_list], expire=300)
-        
         return quiz_list
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{quiz_id}", response_model=Quiz)
+@cached_response(
+    cache_key("quiz", "quiz_id"),
+    soft_ttl=3600,
+    hard_ttl=86400,
+    tags=lambda quiz_id, **_: [f"quiz:{quiz_id}"]
+)
 async def get_quiz_by_id(quiz_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get a specific quiz by its ID.
     """
     logger.info(f"Fetching quiz with ID: {quiz_id}")
     
-    # Try to get cached quiz first
-    cache_key = f"quiz:{quiz_id}"
-    cached_quiz = await redis_client.get_json(cache_key)
-    
-    if cached_quiz:
-        logger.info(f"Found cached quiz with ID: {quiz_id}")
-        return Quiz(**cached_quiz)
-    
     try:
         # Query quiz from database
         query = select(QuizModel).where(QuizModel.id == quiz_id)
@@ -162,10 +157,6 @@ async def get_quiz_by_id(quiz_id: int, db: AsyncSession = Depends(get_db)):
             time_limit=quiz_db.time_limit
         )
         
-        # Cache the quiz for 1 hour
-        await redis_client.set_json(cache_key, quiz.dict(), expire=3600)
-        logger.info(f"Cached quiz with ID: {quiz_id}")
-        
         return quiz
         
     except HTTPException:
@@ -196,10 +187,14 @@ async def generate_quiz(request: QuizRequest, db: AsyncSession = Depends(get_db)
                 detail="video_id must be an integer"
             )
         
-        # Check if video exists
-        video_query = select(Video).where(Video.id == video_id_int)
-        video_result = await db.execute(video_query)
-        video = video_result.scalar_one_or_none()
+        # Check if video exists, skipping the database for ids recently found missing
+        video = None
+        if not await redis_client.is_known_missing(f"video:{video_id_int}"):
+            video_query = select(Video).where(Video.id == video_id_int)
+            video_result = await db.execute(video_query)
+            video = video_result.scalar_one_or_none()
+            if not video:
+                await redis_client.mark_missing(f"video:{video_id_int}")
         
         if not video:
             logger.error(f"Video with ID {video_id_int} not found")
@@ -297,9 +292,10 @@ async def generate_quiz(request: QuizRequest, db: AsyncSession = Depends(get_db)
                 time_limit=new_quiz.time_limit
             )
             
-            # Cache the quiz
-            cache_key = f"quiz:{new_quiz.id}"
-            await redis_client.set_json(cache_key, quiz.dict(), expire=86400)
+            # Cache the quiz (replacing any "not found" tombstone for its id)
+            # and drop quiz listings that no longer include everything
+            await prime_response(f"quiz:{new_quiz.id}", quiz, hard_ttl=86400, tags=[f"quiz:{new_quiz.id}"])
+            await redis_client.invalidate_tags("quiz")
             logger.info(f"Cached quiz with ID: {new_quiz.id}")
             
             return quiz
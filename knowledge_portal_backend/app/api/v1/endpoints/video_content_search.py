@@ -1,13 +1,52 @@
-from fastapi import APIRouter, HTTPException
+from typing import Dict, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request
+from redis.exceptions import RedisError
 from app.core.redis_client import redis_client
-from app.schemas.video_content_search import VideoContentSearchQuery, VideoSearchResponse
+from app.core.config import settings
+from app.core.resilience import CallRejectedError
+from app.core.query_normalizer import normalize_query
+from app.core.metrics import metrics
+from app.core.rate_limit import charge, find_rule
+from app.core.response_cache import cache_key, cached_response, cached_values, popularity_ttl
+from app.schemas.video_content_search import (
+    VideoContentSearchBatchItem, VideoContentSearchBatchQuery, VideoContentSearchBatchResponse,
+    VideoContentSearchQuery, VideoSearchResponse, VideoSearchResult
+)
 from app.services.video_content_search import video_content_search_service
+import asyncio
+import functools
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Spelling variants of a query ("Python Decorators", "python  decorators") share one entry
+content_search_cache_key = cache_key(
+    "video_content_search",
+    "search_query.query",
+    normalize={
+        "search_query.query": functools.partial(
+            normalize_query, strip_stopwords=settings.VIDEO_CONTENT_SEARCH_STRIP_STOPWORDS
+        )
+    }
+)
+CONTENT_SEARCH_SOFT_TTL = 300
+
 @router.post("/query", response_model=VideoSearchResponse)
+@cached_response(
+    content_search_cache_key,
+    soft_ttl=CONTENT_SEARCH_SOFT_TTL,
+    # Hot queries stay cached for up to a day, one-offs expire after minutes
+    hard_ttl=popularity_ttl(
+        content_search_cache_key,
+        min_ttl=settings.VIDEO_CONTENT_SEARCH_MIN_TTL_SECONDS,
+        max_ttl=settings.VIDEO_CONTENT_SEARCH_MAX_TTL_SECONDS,
+        hits_for_max=settings.VIDEO_CONTENT_SEARCH_HITS_FOR_MAX_TTL
+    ),
+    lease_ms=30000,  # The retriever may take up to its 30 second timeout
+    # While the retriever is failing, answer from the last good results
+    serve_stale_for=settings.VIDEO_CONTENT_SEARCH_STALE_SECONDS
+)
 async def search_video_content(search_query: VideoContentSearchQuery):
     """
     Search video content using the video content search service.
@@ -21,28 +60,17 @@ async def search_video_content(search_query: VideoContentSearchQuery):
             await redis_client.init()
             logger.info("Redis client initialized")
 
-        # Try to get cached results
-        cache_key = f"video_content_search:{search_query.query}"
-        logger.info(f"Checking cache for key: {cache_key}")
-        cached_results = await redis_client.get_json(cache_key)
-        
-        if cached_results:
-            logger.info(f"Cache hit for query: {search_query.query}")
-            return VideoSearchResponse(results=cached_results)
-        
-        logger.info("Cache miss, calling video content search service")
+        logger.info("Calling video content search service")
         
         # Call video content search API through our service
         try:
-            response = await video_content_search_service.search_content(search_query.query)
-            
-            # Cache results for 5 minutes
-            logger.info("Caching search results")
-            await redis_client.set_json(cache_key, response.dict()["results"], expire=300)
-            logger.info(f"Cached results for query: {search_query.query}")
-            
-            return response
-            
+            return await video_content_search_service.search_content(search_query.query)
+        except CallRejectedError as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Video search API unavailable: {str(e)}",
+                headers={"Retry-After": str(max(1, round(e.retry_after)))}
+            )
         except Exception as e:
             error_msg = f"Video search API error: {str(e)}"
             logger.error(error_msg)
@@ -59,4 +87,62 @@ async def search_video_content(search_query: VideoContentSearchQuery):
         raise HTTPException(
             status_code=500,
             detail=error_msg
-        ) 
\ No newline at end of file
+        )
+
+@router.post("/batch", response_model=VideoContentSearchBatchResponse)
+async def search_video_content_batch(batch: VideoContentSearchBatchQuery, request: Request):
+    """
+    Search video content for several queries at once, e.g. every skill in a
+    learning path. Queries that normalize to the same cache key are searched
+    once; fresh cached results are read with one MGET and the rest go through
+    /query's cache, at most VIDEO_CONTENT_SEARCH_BATCH_CONCURRENCY at a time.
+    A failed query gets an error instead of failing the batch. Every query
+    that misses the cache counts against /query's rate limit.
+    """
+    if not redis_client.redis_client:
+        await redis_client.init()
+
+    # The first spelling of each distinct query is the one sent to the retriever
+    keys = [content_search_cache_key(search_query=VideoContentSearchQuery(query=query)) for query in batch.queries]
+    unique: Dict[str, str] = {}
+    for key, query in zip(keys, batch.queries):
+        unique.setdefault(key, query)
+
+    outcomes: Dict[str, Tuple[Optional[List[VideoSearchResult]], Optional[str]]] = {}
+    try:
+        cached = await cached_values(
+            content_search_cache_key,
+            [{"search_query": VideoContentSearchQuery(query=query)} for query in unique.values()],
+            soft_ttl=CONTENT_SEARCH_SOFT_TTL
+        )
+    except RedisError as e:
+        logger.warning(f"Response cache unavailable for content search batch: {e}")
+        cached = [None] * len(unique)
+    for key, value in zip(unique, cached):
+        if value is not None:
+            outcomes[key] = (VideoSearchResponse.model_validate(value).results, None)
+    metrics.incr("video_content_search.batch.cache_hits", len(outcomes))
+    metrics.incr("video_content_search.batch.cache_misses", len(unique) - len(outcomes))
+
+    retry_after = await charge(request.scope, find_rule("content_search"), len(unique) - len(outcomes))
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429, detail="Too many requests", headers={"Retry-After": str(retry_after)}
+        )
+
+    semaphore = asyncio.Semaphore(settings.VIDEO_CONTENT_SEARCH_BATCH_CONCURRENCY)
+
+    async def search(key: str, query: str):
+        async with semaphore:
+            try:
+                response = await search_video_content(search_query=VideoContentSearchQuery(query=query))
+                outcomes[key] = (VideoSearchResponse.model_validate(response).results, None)
+            except HTTPException as e:
+                outcomes[key] = (None, str(e.detail))
+
+    await asyncio.gather(*(search(key, query) for key, query in unique.items() if key not in outcomes))
+
+    return VideoContentSearchBatchResponse(results=[
+        VideoContentSearchBatchItem(query=query, results=outcomes[key][0], error=outcomes[key][1])
+        for key, query in zip(keys, batch.queries)
+    ])
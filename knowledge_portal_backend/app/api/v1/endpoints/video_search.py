@@ -1,16 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from typing import Callable, Dict, List, Optional, Tuple
+from elasticsearch.exceptions import BadRequestError, NotFoundError
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.metrics import metrics
 from app.core.redis_client import redis_client
 from app.core.elasticsearch_client import es_client
+from app.services.video_index import video_index_service
+from app.core.response_cache import cache_key, cached_response, prime_response
+import base64
+import hashlib
+import hmac
 import json
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Largest possible _shard_doc sort value
+SHARD_DOC_MAX = 2 ** 63 - 1
+
+# Keyword fields that can be filtered on and are returned as facets
+FACET_FIELDS = ["category", "difficulty_level", "tags", "skills"]
+FACETS_HARD_TTL = 3600
+
+# Query tiers, cheapest first. Empty queries match everything ("all"); other
+# queries run "exact" (phrase and term matches on the boosted fields) and
+# escalate to "fuzzy" (fuzzy matching plus transcript segments) only when the
+# exact tier finds too little (see tiered_search)
+TIER_ALL = "all"
+TIER_EXACT = "exact"
+TIER_FUZZY = "fuzzy"
+facets_cache_key = cache_key("video_facets", "search_query.query", "search_query.filters")
+
+# Exactly what the endpoints below read from a response: the _source fields
+# VideoResponse renders (its id comes from _id) and the response paths used
+# for hits, cursors, segments, facets and suggestions
+RESULT_SOURCE_FIELDS = ["title", "description", "url", "duration", "category", "difficulty_level", "tags", "skills"]
+RESULT_FILTER_PATH = [
+    "hits.total",
+    "hits.max_score",
+    "hits.hits._id",
+    "hits.hits._source",
+    "hits.hits.sort",
+    "hits.hits.inner_hits.segments.hits.hits._source",
+    "hits.hits.inner_hits.segments.hits.hits.highlight",
+    "aggregations",
+    "pit_id"
+]
+FACETS_FILTER_PATH = ["hits.total", "hits.max_score", "aggregations"]
+SUGGEST_FILTER_PATH = ["suggest.videos.options.text"]
+
+class VideoSearchFilters(BaseModel):
+    # Values within a field are OR-ed, fields are AND-ed
+    category: List[str] = []
+    difficulty_level: List[str] = []
+    tags: List[str] = []
+    skills: List[str] = []
+
+    @field_validator("*")
+    @classmethod
+    def normalize(cls, values: List[str]) -> List[str]:
+        # Sorted and deduplicated, so equivalent filters share cache entries
+        return sorted(set(values))
 
 class VideoSearchQuery(BaseModel):
-    query: str
+    query: str = ""  # Empty matches every video, e.g. for browsing by filters
     page: int = 1
-    per_page: int = 10
+    per_page: int = Field(10, ge=1, le=settings.VIDEO_SEARCH_MAX_PER_PAGE)
+    filters: VideoSearchFilters = VideoSearchFilters()
+    include_facets: bool = False
+    # Opaque token from a previous response's next_cursor; takes precedence over page
+    cursor: Optional[str] = None
+
+class SegmentHit(BaseModel):
+    start: Optional[float] = None  # seconds into the video
+    end: Optional[float] = None
+    highlight: Optional[str] = None
 
 class VideoResponse(BaseModel):
     id: str
@@ -22,97 +89,414 @@ class VideoResponse(BaseModel):
     difficulty_level: str
     tags: List[str]
     skills: List[str]
+    # Best matching transcript segments, when the query matched the transcript
+    segments: List[SegmentHit] = []
 
-@router.post("/search", response_model=List[VideoResponse])
-async def search_videos(search_query: VideoSearchQuery):
-    # Try to get cached results
-    cache_key = f"video_search:{search_query.query}:{search_query.page}"
-    cached_results = await redis_client.get_json(cache_key)
-    
-    if cached_results:
-        return cached_results
-    
-    # Prepare Elasticsearch query
-    query = {
-        "from": (search_query.page - 1) * search_query.per_page,
-        "size": search_query.per_page,
-        "query": {
-            "multi_match": {
-                "query": search_query.query,
-                "fields": [
-                    "title^3",
-                    "description^2",
-                    "tags^2",
-                    "skills^2",
-                    "category",
-                    "transcript"
+class FacetBucket(BaseModel):
+    value: str
+    count: int
+
+class VideoSearchPage(BaseModel):
+    results: List[VideoResponse]
+    # Pass back as "cursor" to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+    # Counts per value of each FACET_FIELDS field, when include_facets is set
+    facets: Optional[Dict[str, List[FacetBucket]]] = None
+    # The query tier that produced the results: "all", "exact" or "fuzzy"
+    tier: Optional[str] = None
+
+def build_segments_query(search_query: VideoSearchQuery, with_hits: bool) -> dict:
+    nested = {
+        "nested": {
+            "path": "segments",
+            "query": {"match": {"segments.text": {"query": search_query.query, "fuzziness": "AUTO"}}},
+            "score_mode": "max"
+        }
+    }
+    if with_hits:
+        # The best matching segments per video, with a short highlighted fragment each
+        nested["nested"]["inner_hits"] = {
+            "size": settings.VIDEO_SEARCH_SEGMENT_HITS,
+            "_source": ["segments.start", "segments.end"],
+            "highlight": {
+                "fields": {
+                    "segments.text": {
+                        "fragment_size": settings.VIDEO_SEARCH_FRAGMENT_SIZE,
+                        "number_of_fragments": 1
+                    }
+                }
+            }
+        }
+    return nested
+
+def build_exact_query(search_query: VideoSearchQuery) -> dict:
+    return {
+        "bool": {
+            "should": [
+                {
+                    "multi_match": {
+                        "query": search_query.query,
+                        "fields": ["title^3", "description^2", "category"],
+                        "type": "phrase"
+                    }
+                },
+                *(
+                    {"term": {field: {"value": search_query.query.strip(), "case_insensitive": True, "boost": 2}}}
+                    for field in ("tags", "skills")
+                )
+            ],
+            "minimum_should_match": 1
+        }
+    }
+
+def build_bool_query(search_query: VideoSearchQuery, tier: str, with_segment_hits: bool = False) -> dict:
+    if tier == TIER_EXACT:
+        match = build_exact_query(search_query)
+    elif tier == TIER_FUZZY:
+        match = {
+            "bool": {
+                "should": [
+                    {
+                        "multi_match": {
+                            "query": search_query.query,
+                            "fields": [
+                                "title^3",
+                                "description^2",
+                                "tags^2",
+                                "skills^2",
+                                "category"
+                            ],
+                            "type": "most_fields",
+                            "fuzziness": "AUTO"
+                        }
+                    },
+                    build_segments_query(search_query, with_segment_hits)
                 ],
-                "type": "most_fields",
-                "fuzziness": "AUTO"
+                "minimum_should_match": 1
             }
-        },
+        }
+    else:
+        match = {"match_all": {}}
+
+    # Filter context: not scored, and cached by Elasticsearch across queries
+    filters = [
+        {"terms": {field: values}}
+        for field, values in search_query.filters.model_dump().items() if values
+    ]
+    return {"bool": {"must": [match], "filter": filters}}
+
+def build_facet_aggregations() -> dict:
+    return {
+        field: {"terms": {"field": field, "size": settings.VIDEO_SEARCH_FACET_SIZE}}
+        for field in FACET_FIELDS
+    }
+
+def parse_facets(search_results: dict) -> Dict[str, List[FacetBucket]]:
+    aggregations = search_results.get("aggregations", {})
+    return {
+        field: [
+            FacetBucket(value=str(bucket["key"]), count=bucket["doc_count"])
+            for bucket in aggregations.get(field, {}).get("buckets", [])
+        ]
+        for field in FACET_FIELDS
+    }
+
+def build_search_query(search_query: VideoSearchQuery, tier: str) -> dict:
+    return {
+        # One extra hit tells us whether there is a next page
+        "size": search_query.per_page + 1,
+        "query": build_bool_query(search_query, tier, with_segment_hits=True),
         "sort": [
-            "_score"
+            "_score",
+            {"id": "asc"}  # Tiebreaker, so search_after never skips or repeats hits
         ]
     }
-    
+
+def _query_digest(search_query: VideoSearchQuery) -> str:
+    key = f"{search_query.query}\n{search_query.filters.model_dump_json()}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+def exact_tier_is_enough(search_results: dict) -> bool:
+    hits = search_results["hits"]
+    return (
+        hits.get("total", {}).get("value", 0) >= settings.VIDEO_SEARCH_EXACT_MIN_HITS
+        and (hits.get("max_score") or 0) >= settings.VIDEO_SEARCH_EXACT_MIN_SCORE
+    )
+
+async def tiered_search(
+    search_query: VideoSearchQuery,
+    build_body: Callable[[str], dict],
+    **projection
+) -> Tuple[str, dict]:
+    """
+    Run build_body(tier) for the cheapest tier that finds enough; returns
+    the tier and its results. Escalating costs a second request, but most
+    queries are answered by the exact tier without fuzzy expansion or the
+    nested transcript query.
+    """
+    tier = TIER_EXACT if search_query.query.strip() else TIER_ALL
+    if tier == TIER_EXACT:
+        body = build_body(TIER_EXACT)
+        # Count just far enough to compare against the threshold, and score despite
+        # the sort; max_score needs at least one hit even when only facets are wanted
+        body["track_total_hits"] = settings.VIDEO_SEARCH_EXACT_MIN_HITS
+        body["track_scores"] = True
+        body["size"] = max(body.get("size", 10), 1)
+        search_results = await es_client.search("videos", body, **projection)
+        if exact_tier_is_enough(search_results):
+            metrics.incr("video_search.tier.exact")
+            return tier, search_results
+        metrics.incr("video_search.tier.escalated")
+        tier = TIER_FUZZY
+
+    search_results = await es_client.search("videos", build_body(tier), **projection)
+    metrics.incr(f"video_search.tier.{tier}")
+    return tier, search_results
+
+def encode_cursor(search_query: VideoSearchQuery, search_after: list, pit_id: Optional[str], tier: str) -> str:
+    payload = {
+        "q": _query_digest(search_query),
+        "n": search_query.per_page,
+        "after": search_after,
+        "pit": pit_id,
+        # Later pages keep the tier the first page was answered with
+        "tier": tier
+    }
+    encoded = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    return f"{encoded}.{_cursor_signature(encoded)}"
+
+def _cursor_signature(encoded: str) -> str:
+    # Signed so clients cannot forge the point in time or sort values sent to Elasticsearch
+    digest = hmac.new(settings.SECRET_KEY.get_secret_value().encode(), encoded.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+def decode_cursor(search_query: VideoSearchQuery) -> dict:
+    try:
+        encoded, _, signature = search_query.cursor.partition(".")
+        if not hmac.compare_digest(signature, _cursor_signature(encoded)):
+            raise ValueError("bad signature")
+        payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        valid = (
+            payload["q"] == _query_digest(search_query)
+            and isinstance(payload["after"], list)
+            and payload["tier"] in (TIER_ALL, TIER_EXACT, TIER_FUZZY)
+        )
+    except (ValueError, KeyError, TypeError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor for this query")
+    return payload
+
+def parse_segment_hits(hit: dict) -> List[SegmentHit]:
+    segments = []
+    for segment in hit.get("inner_hits", {}).get("segments", {}).get("hits", {}).get("hits", []):
+        source = segment.get("_source", {})
+        fragments = segment.get("highlight", {}).get("segments.text", [])
+        segments.append(SegmentHit(
+            start=source.get("start"),
+            end=source.get("end"),
+            highlight=fragments[0] if fragments else None
+        ))
+    return segments
+
+def build_page(search_query: VideoSearchQuery, hits: List[dict], pit_id: Optional[str], tier: str) -> VideoSearchPage:
+    videos = []
+    for hit in hits[:search_query.per_page]:
+        source = hit["_source"]
+        video = VideoResponse(
+            id=hit["_id"],
+            title=source["title"],
+            description=source["description"],
+            url=source["url"],
+            duration=source["duration"],
+            category=source["category"],
+            difficulty_level=source["difficulty_level"],
+            tags=source["tags"],
+            skills=source["skills"],
+            segments=parse_segment_hits(hit)
+        )
+        videos.append(video)
+
+    next_cursor = None
+    if len(hits) > search_query.per_page:
+        next_cursor = encode_cursor(search_query, hits[search_query.per_page - 1]["sort"], pit_id, tier)
+    return VideoSearchPage(results=videos, next_cursor=next_cursor, tier=tier)
+
+@router.post("/search", response_model=VideoSearchPage)
+async def search_videos(search_query: VideoSearchQuery):
+    """
+    Search videos. Shallow pages can be requested by number; every page
+    also returns a next_cursor, and deeper pages must be fetched by passing
+    it back as "cursor" (search_after over a point in time).
+    """
+    if search_query.cursor:
+        page = await search_videos_after(search_query)
+    elif search_query.page * search_query.per_page > settings.VIDEO_SEARCH_MAX_PAGE_DEPTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Pages beyond the first {settings.VIDEO_SEARCH_MAX_PAGE_DEPTH} results must be requested with a cursor"
+        )
+    else:
+        # A dict from the cache, or the endpoint's own VideoSearchPage when the cache is down
+        page = VideoSearchPage.model_validate(await search_videos_page(search_query=search_query))
+
+    if search_query.include_facets:
+        # Usually a cache hit: facets are cached per query and filters, not per page
+        facets = await search_video_facets(search_query=search_query)
+        page = VideoSearchPage.model_validate({**page.model_dump(), "facets": facets})
+    return page
+
+@cached_response(
+    cache_key("video_search", "search_query.query", "search_query.filters", "search_query.page", "search_query.per_page"),
+    soft_ttl=900,
+    hard_ttl=21600,
+    tags=["video"]  # Invalidated whenever a video is created, updated or deleted
+)
+async def search_videos_page(search_query: VideoSearchQuery) -> VideoSearchPage:
+    facets_key = facets_cache_key(search_query=search_query)
+    with_facets = False
+    if search_query.include_facets:
+        try:
+            with_facets = not await redis_client.redis_client.exists(facets_key)
+        except RedisError as e:
+            logger.warning(f"Could not check the facets cache: {e}")
+            with_facets = True
+
+    def build_body(tier: str) -> dict:
+        query = build_search_query(search_query, tier)
+        query["from"] = (search_query.page - 1) * search_query.per_page
+        if with_facets:
+            # Compute the facets in the same request and cache them on their own
+            query["aggs"] = build_facet_aggregations()
+        return query
+
     try:
         # Initialize Elasticsearch client if not already initialized
         if not es_client.es_client:
             await es_client.init()
             
         # Search in Elasticsearch
-        search_results = await es_client.search("videos", query)
-        
-        # Process results
-        videos = []
-        for hit in search_results["hits"]["hits"]:
-            source = hit["_source"]
-            video = VideoResponse(
-                id=hit["_id"],
-                title=source["title"],
-                description=source["description"],
-                url=source["url"],
-                duration=source["duration"],
-                category=source["category"],
-                difficulty_level=source["difficulty_level"],
-                tags=source["tags"],
-                skills=source["skills"]
-            )
-            videos.append(video)
-        
-        # Cache results for 5 minutes
-        await redis_client.set_json(cache_key, [video.dict() for video in videos], expire=300)
-        
-        return videos
+        tier, search_results = await tiered_search(
+            search_query, build_body, source_includes=RESULT_SOURCE_FIELDS, filter_path=RESULT_FILTER_PATH
+        )
+        if with_facets:
+            try:
+                await prime_response(
+                    facets_key,
+                    parse_facets(search_results),
+                    hard_ttl=FACETS_HARD_TTL,
+                    tags=["video"]
+                )
+            except RedisError as e:
+                logger.warning(f"Could not cache facets under {facets_key}: {e}")
+        # The first cursor has no point in time yet; one is opened when it is used
+        return build_page(search_query, search_results["hits"]["hits"], pit_id=None, tier=tier)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Index mapping setup endpoint
-@router.post("/setup-index")
-async def setup_video_index():
-    mapping = {
-        "properties": {
-            "title": {"type": "text", "analyzer": "standard"},
-            "description": {"type": "text", "analyzer": "standard"},
-            "url": {"type": "keyword"},
-            "duration": {"type": "integer"},
-            "category": {"type": "keyword"},
-            "difficulty_level": {"type": "keyword"},
-            "tags": {"type": "keyword"},
-            "skills": {"type": "keyword"},
-            "transcript": {"type": "text", "analyzer": "standard"},
-            "created_at": {"type": "date"},
-            "updated_at": {"type": "date"}
+@cached_response(facets_cache_key, soft_ttl=300, hard_ttl=FACETS_HARD_TTL, tags=["video"])
+async def search_video_facets(search_query: VideoSearchQuery) -> Dict[str, List[FacetBucket]]:
+    """Facet counts alone (no hits), e.g. for the landing page's empty query"""
+    def build_body(tier: str) -> dict:
+        return {
+            "size": 0,
+            "query": build_bool_query(search_query, tier),
+            "aggs": build_facet_aggregations()
+        }
+    try:
+        if not es_client.es_client:
+            await es_client.init()
+        # Same tier as the results, so the counts describe the videos that are shown
+        _, search_results = await tiered_search(search_query, build_body, filter_path=FACETS_FILTER_PATH)
+        return parse_facets(search_results)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def search_videos_after(search_query: VideoSearchQuery) -> VideoSearchPage:
+    cursor = decode_cursor(search_query)
+    try:
+        search_query = VideoSearchQuery.model_validate({**search_query.model_dump(), "per_page": cursor["n"]})
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="Invalid cursor for this query")
+    tier = cursor["tier"]
+
+    try:
+        search_after = cursor["after"]
+        pit_id = cursor["pit"]
+        if pit_id is None:
+            # First cursor page after page-number mode. Searches over a point in time
+            # sort by an implicit extra _shard_doc tiebreaker; (score, id) is already
+            # unique, so its largest value just resumes right after the last hit
+            pit_id = await es_client.open_point_in_time("videos", settings.VIDEO_SEARCH_PIT_KEEP_ALIVE)
+            search_after = [*search_after, SHARD_DOC_MAX]
+        query = build_search_query(search_query, tier)
+        query["search_after"] = search_after
+        query["pit"] = {"id": pit_id, "keep_alive": settings.VIDEO_SEARCH_PIT_KEEP_ALIVE}
+
+        search_results = await es_client.search(
+            "videos", query, source_includes=RESULT_SOURCE_FIELDS, filter_path=RESULT_FILTER_PATH
+        )
+        # Elasticsearch may hand back a new id for the same point in time
+        pit_id = search_results.get("pit_id", pit_id)
+        page = build_page(search_query, search_results["hits"]["hits"], pit_id, tier)
+        if page.next_cursor is None:
+            await es_client.close_point_in_time(pit_id)
+        return page
+    except NotFoundError:
+        raise HTTPException(status_code=410, detail="Cursor expired, start the search again")
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class VideoSuggestResponse(BaseModel):
+    suggestions: List[str]
+
+def suggest_cache_key(q: str, size: int) -> str:
+    return f"video_suggest:{q.strip().lower()}:{size}"
+
+@router.get("/suggest", response_model=VideoSuggestResponse)
+@cached_response(suggest_cache_key, soft_ttl=60, hard_ttl=300)  # Short-lived, so not tagged
+async def suggest_videos(
+    q: str = Query(..., min_length=1, max_length=100),
+    size: int = Query(8, ge=1, le=20)
+):
+    """
+    Search-as-you-type suggestions from video titles, tags and skills. Uses
+    the completion suggester, which answers from an in-memory prefix
+    structure instead of scoring the full-text fields.
+    """
+    query = {
+        "size": 0,
+        # Completion options carry the whole document by default; only the text is shown
+        "_source": False,
+        "suggest": {
+            "videos": {
+                "prefix": q.strip(),
+                "completion": {
+                    "field": "suggest",
+                    "size": size,
+                    "skip_duplicates": True
+                }
+            }
         }
     }
-    
     try:
-        # Initialize Elasticsearch client if not already initialized
         if not es_client.es_client:
             await es_client.init()
-            
-        await es_client.create_index("videos", mapping)
-        return {"message": "Video index created successfully"}
+        search_results = await es_client.search("videos", query, filter_path=SUGGEST_FILTER_PATH)
+        options = search_results.get("suggest", {}).get("videos", [{}])[0].get("options", [])
+        return VideoSuggestResponse(suggestions=[option["text"] for option in options])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Index mapping setup endpoint
+@router.post("/setup-index")
+async def setup_video_index():
+    try:
+        # Searches read the versioned index behind the "videos" alias (see app/services/video_index.py)
+        if await video_index_service.ensure_index():
+            return {"message": "Video index created successfully"}
+        return {"message": "Video index already exists"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import deps
-from app.core.elasticsearch_client import es_client
+from app.core.redis_client import redis_client
 from app.models.video import Video
 from sqlalchemy import select
 from app.schemas.video import VideoCreate
+from app.services.video_index import video_index_service
 
 router = APIRouter()
 
@@ -37,86 +38,33 @@ async def create_test_video(db: AsyncSession = Depends(deps.get_db)):
     db.add(test_video)
     await db.commit()
     await db.refresh(test_video)
+    await redis_client.clear_missing(f"video:{test_video.id}")
+    await redis_client.invalidate_tags("video")
     
     return {"message": "Test video created", "video_id": test_video.id}
 
-@router.post("/setup-index")
-async def setup_video_index(db: AsyncSession = Depends(deps.get_db)):
+@router.post("/setup-index", status_code=202)
+async def setup_video_index():
     """
-    Set up Elasticsearch index for videos and populate it with data from the database.
+    Rebuild the Elasticsearch video index from the database in the background.
+    Searches keep using the current index until the new one is complete.
     """
-    # Define index mapping
-    mapping = {
-        "mappings": {
-            "properties": {
-                "id": {"type": "keyword"},
-                "title": {
-                    "type": "text",
-                    "analyzer": "standard",
-                    "fields": {
-                        "keyword": {"type": "keyword"}
-                    }
-                },
-                "description": {"type": "text", "analyzer": "standard"},
-                "url": {"type": "keyword"},
-                "duration": {"type": "float"},
-                "thumbnail_url": {"type": "keyword"},
-                "category": {"type": "keyword"},
-                "difficulty_level": {"type": "keyword"},
-                "transcript": {"type": "text", "analyzer": "standard"},
-                "tags": {"type": "keyword"},
-                "skills": {"type": "keyword"},
-                "created_at": {"type": "date"},
-                "updated_at": {"type": "date"}
-            }
-        },
-        "settings": {
-            "number_of_shards": 1,
-            "number_of_replicas": 0,
-            "analysis": {
-                "analyzer": {
-                    "standard": {
-                        "type": "standard",
-                        "stopwords": "_english_"
-                    }
-                }
-            }
-        }
-    }
-
     try:
-        # Initialize Elasticsearch client if not already initialized
-        if not es_client.es_client:
-            await es_client.init()
-
-        # Create or recreate index
-        if await es_client.es_client.indices.exists(index="videos"):
-            await es_client.es_client.indices.delete(index="videos")
-        await es_client.es_client.indices.create(index="videos", **mapping)
-
-        # Get videos from database
-        result = await db.execute(select(Video))
-        videos = result.scalars().all()
-
-        # Index videos
-        for video in videos:
-            doc = {
-                "id": video.id,
-                "title": video.title,
-                "description": video.description,
-                "url": str(video.url),
-                "duration": video.duration,
-                "thumbnail_url": str(video.thumbnail_url) if video.thumbnail_url else None,
-                "category": video.category,
-                "difficulty_level": video.difficulty_level,
-                "transcript": video.transcript,
-                "tags": [tag.name for tag in video.tags],
-                "skills": [skill.name for skill in video.skills],
-                "created_at": video.created_at.isoformat(),
-                "updated_at": video.updated_at.isoformat()
-            }
-            await es_client.index_document("videos", doc, str(video.id))
-
-        return {"message": "Video index created and populated successfully"}
+        if not await video_index_service.start_rebuild():
+            raise HTTPException(status_code=409, detail="A video index rebuild is already running")
+        return {"message": "Video index rebuild started"}
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error setting up video index: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error setting up video index: {str(e)}")
+
+@router.get("/setup-index")
+async def get_video_index_status():
+    """
+    Report whether a rebuild is running and the outcome of the last one.
+    """
+    last_report = await video_index_service.last_report()
+    return {
+        "running": await video_index_service.rebuild_running(),
+        "last_rebuild": last_report.model_dump() if last_report else None
+    }
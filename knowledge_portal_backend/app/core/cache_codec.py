@@ -0,0 +1,121 @@
+"""
+Serialization and compression for Redis cache values.
+
+Encoded values start with a one-byte header:
+
+    bits 0-2  serializer   (1 = JSON, 2 = MessagePack)
+    bits 3-4  compression  (0 = none, 1 = zlib, 2 = lz4)
+
+Every header value is below 0x20, and json.dumps output never starts with
+a byte that low, so values written as plain JSON text before this header
+existed still decode.
+
+orjson, msgpack and lz4 are optional. JSON is encoded with orjson when it
+is installed (its output is ordinary JSON, so either library can decode
+it); MessagePack and lz4 are only available when their packages are.
+"""
+from typing import Any
+import json
+import logging
+import zlib
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - optional dependency
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+SERIALIZER_JSON = 1
+SERIALIZER_MSGPACK = 2
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_LZ4 = 2
+
+SERIALIZERS = {"json": SERIALIZER_JSON, "orjson": SERIALIZER_JSON, "msgpack": SERIALIZER_MSGPACK}
+COMPRESSIONS = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "lz4": COMPRESSION_LZ4}
+
+# Anything at or above this is the first byte of a legacy JSON value
+LEGACY_JSON_MIN_BYTE = 0x20
+
+
+class CacheCodec:
+    def __init__(self, serializer: str = "json", compression: str = "none", compression_min_bytes: int = 1024):
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown cache serializer: {serializer}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+
+        self.serializer = SERIALIZERS[serializer]
+        if self.serializer == SERIALIZER_MSGPACK and msgpack is None:
+            logger.warning("msgpack is not installed, falling back to JSON cache serialization")
+            self.serializer = SERIALIZER_JSON
+
+        self.compression = COMPRESSIONS[compression]
+        if self.compression == COMPRESSION_LZ4 and lz4_frame is None:
+            logger.warning("lz4 is not installed, falling back to zlib cache compression")
+            self.compression = COMPRESSION_ZLIB
+
+        self.compression_min_bytes = compression_min_bytes
+
+    def encode(self, value: Any) -> bytes:
+        if self.serializer == SERIALIZER_MSGPACK:
+            payload = msgpack.packb(value, use_bin_type=True)
+        elif orjson is not None:
+            payload = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            payload = json.dumps(value, separators=(",", ":")).encode()
+
+        compression = COMPRESSION_NONE
+        if self.compression != COMPRESSION_NONE and len(payload) >= self.compression_min_bytes:
+            compression = self.compression
+            payload = _compress(compression, payload)
+
+        return bytes([compression << 3 | self.serializer]) + payload
+
+    def decode(self, data: bytes) -> Any:
+        if data[0] >= LEGACY_JSON_MIN_BYTE:
+            return _loads_json(data)
+
+        header = data[0]
+        payload = _decompress(header >> 3, data[1:])
+        if header & 0b111 == SERIALIZER_MSGPACK:
+            if msgpack is None:
+                raise ValueError("Cache value is MessagePack-encoded but msgpack is not installed")
+            return msgpack.unpackb(payload, raw=False)
+        return _loads_json(payload)
+
+
+def _loads_json(payload: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _compress(compression: int, payload: bytes) -> bytes:
+    if compression == COMPRESSION_LZ4:
+        return lz4_frame.compress(payload)
+    return zlib.compress(payload, 1)
+
+
+def _decompress(compression: int, payload: bytes) -> bytes:
+    if compression == COMPRESSION_NONE:
+        return payload
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(payload)
+    if compression == COMPRESSION_LZ4:
+        if lz4_frame is None:
+            raise ValueError("Cache value is lz4-compressed but lz4 is not installed")
+        return lz4_frame.decompress(payload)
+    raise ValueError(f"Unknown cache compression id: {compression}")
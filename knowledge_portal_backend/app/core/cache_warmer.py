@@ -0,0 +1,155 @@
+"""
+Cache warming from access statistics.
+
+Cached reads are sampled into per-group popularity sorted sets
+("cache:popular:{group}", e.g. group "quiz" with members "42"). Shortly
+after startup, and then every CACHE_WARM_INTERVAL_SECONDS, one worker
+loads the top CACHE_WARM_TOP_N members of each group through the warm
+function registered for it, so the first users after a deploy or a Redis
+restart do not all miss. Scores decay on every cycle, so popularity tracks
+recent traffic rather than all-time totals.
+"""
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+import asyncio
+import logging
+import random
+import time
+import uuid
+
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.redis_client import redis_client
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+WarmFunction = Callable[[str], Awaitable[None]]
+
+LOCK_KEY = "lock:cache_warm"
+
+
+class CacheWarmer:
+    def __init__(self):
+        self._warmers: Dict[str, WarmFunction] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _popularity_key(group: str) -> str:
+        return f"cache:popular:{group}"
+
+    def register(self, group: str, warm: WarmFunction):
+        """Register the coroutine that loads one member of group into the cache"""
+        self._warmers[group] = warm
+
+    @staticmethod
+    def _sample_rate(group: str) -> float:
+        return settings.CACHE_WARM_SAMPLE_RATES.get(group, settings.CACHE_WARM_SAMPLE_RATE)
+
+    def _tracked(self, group: str) -> bool:
+        return (
+            settings.CACHE_WARM_ENABLED
+            and group in settings.CACHE_WARM_GROUPS
+            and random.random() < self._sample_rate(group)
+        )
+
+    async def record(self, group: str, member: str):
+        """Count a (sampled) read of member; never fails the read itself"""
+        await self.record_many(group, [member])
+
+    async def record_many(self, group: str, members: Iterable[str]):
+        if not self._tracked(group) or redis_client.redis_client is None:
+            return
+        try:
+            async with redis_client.redis_client.pipeline(transaction=False) as pipe:
+                for member in members:
+                    pipe.zincrby(self._popularity_key(group), 1, str(member))
+                await pipe.execute()
+        except RedisError as e:
+            logger.debug(f"Could not record cache popularity for {group}: {e}")
+
+    async def popularity(self, group: str, member: str) -> float:
+        """Estimated recent reads of member (decayed like the scores)"""
+        score = await redis_client.redis_client.zscore(self._popularity_key(group), member)
+        return (score or 0) / self._sample_rate(group)
+
+    async def warm(self) -> int:
+        """Load the most popular members of every configured group; returns how many were warmed"""
+        semaphore = asyncio.Semaphore(settings.CACHE_WARM_CONCURRENCY)
+
+        async def warm_one(group: str, member: str) -> bool:
+            async with semaphore:
+                try:
+                    await self._warmers[group](member)
+                    return True
+                except Exception as e:
+                    logger.warning(f"Warming {group} {member} failed: {e}")
+                    return False
+
+        jobs = []
+        for group in settings.CACHE_WARM_GROUPS:
+            if group not in self._warmers:
+                continue
+            members = await redis_client.redis_client.zrevrange(
+                self._popularity_key(group), 0, settings.CACHE_WARM_TOP_N - 1
+            )
+            jobs.extend(warm_one(group, member.decode()) for member in members)
+
+        started = time.monotonic()
+        warmed = sum(await asyncio.gather(*jobs))
+        metrics.incr("cache.warm.keys", warmed)
+        metrics.incr("cache.warm.failures", len(jobs) - warmed)
+        logger.info(f"Warmed {warmed}/{len(jobs)} cache entries in {time.monotonic() - started:.1f}s")
+        return warmed
+
+    async def _decay(self):
+        """Age out old traffic and bound the size of each popularity set"""
+        async with redis_client.redis_client.pipeline(transaction=False) as pipe:
+            for group in settings.CACHE_WARM_GROUPS:
+                key = self._popularity_key(group)
+                pipe.zunionstore(key, {key: settings.CACHE_WARM_DECAY})
+                pipe.zremrangebyrank(key, 0, -settings.CACHE_WARM_TRACKED_KEYS - 1)
+            await pipe.execute()
+
+    async def run_once(self):
+        """
+        One warming cycle. Workers that start together skip the cycle while
+        another one holds the lease, and warm functions only load entries
+        that are missing, so overlapping cycles stay cheap.
+        """
+        token = uuid.uuid4().hex
+        lease_ms = settings.CACHE_WARM_INTERVAL_SECONDS * 1000
+        if not await redis_client.acquire_lock(LOCK_KEY, token, lease_ms):
+            return
+        try:
+            await self.warm()
+            await self._decay()
+        finally:
+            await redis_client.release_lock(LOCK_KEY, token)
+
+    async def _run(self):
+        await asyncio.sleep(settings.CACHE_WARM_STARTUP_DELAY_SECONDS)
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning(f"Cache warming cycle failed: {e}")
+            await asyncio.sleep(settings.CACHE_WARM_INTERVAL_SECONDS)
+
+    def start(self):
+        """Start warming in the background; does not wait for the first cycle"""
+        if settings.CACHE_WARM_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+cache_warmer = CacheWarmer()
@@ -61,11 +61,95 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_PASSWORD: Optional[str] = None
 
+    # In-process (L1) cache in front of Redis
+    LOCAL_CACHE_ENABLED: bool = False
+    LOCAL_CACHE_MAX_ENTRIES: int = 1000
+    # Seconds an entry may live in process memory, by key prefix (longest match wins).
+    # Keys that match no prefix are never cached locally.
+    LOCAL_CACHE_TTLS: Dict[str, int] = {
+        "quiz:": 60,
+        "available_quizzes:": 30,
+        "video_search:": 30,
+        "video_suggest:": 10,
+        "video:": 60,
+        "learning_path:": 60
+    }
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+
+    # Cache value encoding (see app/core/cache_codec.py)
+    CACHE_SERIALIZER: str = "orjson"  # json, orjson or msgpack
+    CACHE_COMPRESSION: str = "zlib"  # none, zlib or lz4
+    CACHE_COMPRESSION_MIN_BYTES: int = 1024
+
+    # Cache stampede protection
+    CACHE_LOCK_TIMEOUT_MS: int = 5000  # Lease held by the worker recomputing a missed key
+    CACHE_LOCK_POLL_INTERVAL_MS: int = 50  # First poll for a value another worker is loading; doubles up to the max
+    CACHE_LOCK_POLL_MAX_INTERVAL_MS: int = 500
+    CACHE_EARLY_EXPIRATION_BETA: float = 1.0  # 0 disables probabilistic early expiration
+
+    # Negative caching of "not found" lookups
+    NEGATIVE_CACHE_ENABLED: bool = True
+    NEGATIVE_CACHE_TTL_SECONDS: int = 60
+
+    # Cache warming from sampled access statistics (see app/core/cache_warmer.py)
+    CACHE_WARM_ENABLED: bool = True
+    CACHE_WARM_GROUPS: List[str] = [
+        "quiz", "available_quizzes", "video", "video_search", "video_facets", "video_content_search"
+    ]
+    CACHE_WARM_TOP_N: int = 50  # Entries preloaded per group and cycle
+    CACHE_WARM_CONCURRENCY: int = 4
+    CACHE_WARM_STARTUP_DELAY_SECONDS: int = 5
+    CACHE_WARM_INTERVAL_SECONDS: int = 900
+    CACHE_WARM_SAMPLE_RATE: float = 0.1  # Fraction of cached reads counted towards popularity
+    # Per-group sample rates; content search counts every read, its TTLs depend on it
+    CACHE_WARM_SAMPLE_RATES: Dict[str, float] = {"video_content_search": 1.0}
+    CACHE_WARM_DECAY: float = 0.5  # Popularity scores are multiplied by this after each cycle
+    CACHE_WARM_TRACKED_KEYS: int = 1000  # Members kept per popularity set
+
+    # Rate Limiting (requests per minute per user, or per client IP when anonymous)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN_PER_MINUTE: int = 10
+    RATE_LIMIT_QUIZ_GENERATE_PER_MINUTE: int = 5
+    RATE_LIMIT_CONTENT_SEARCH_PER_MINUTE: int = 30
+    RATE_LIMIT_CONTENT_SEARCH_BATCH_PER_MINUTE: int = 5
+    # Only enable behind a proxy that overwrites X-Forwarded-For, otherwise clients can spoof it
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False
+
     # Elasticsearch Configuration
     ELASTICSEARCH_HOST: str = "localhost"
     ELASTICSEARCH_PORT: int = 9200
     ELASTICSEARCH_USERNAME: Optional[str] = None
     ELASTICSEARCH_PASSWORD: Optional[str] = None
+    # Bulk indexing (see app/services/video_index.py)
+    ELASTICSEARCH_BULK_CHUNK_SIZE: int = 500  # Documents per bulk request
+    ELASTICSEARCH_BULK_MAX_IN_FLIGHT: int = 4  # Concurrent bulk requests
+    # Reindexing builds videos_v{N} behind the "videos" alias
+    ELASTICSEARCH_INDEX_VERSIONS_TO_KEEP: int = 2  # Newest versions kept, for rollback
+    ELASTICSEARCH_REINDEX_MAX_FAILURES: int = 0  # More failed documents than this aborts the swap
+    # Video search pagination: page numbers up to this many results deep, cursors beyond
+    VIDEO_SEARCH_MAX_PAGE_DEPTH: int = 1000
+    VIDEO_SEARCH_MAX_PER_PAGE: int = 100
+    VIDEO_SEARCH_PIT_KEEP_ALIVE: str = "2m"  # How long a cursor stays valid between pages
+    VIDEO_SEARCH_FACET_SIZE: int = 20  # Values returned per facet
+    VIDEO_SEGMENT_WORDS: int = 60  # Transcript words per indexed segment
+    VIDEO_SEARCH_SEGMENT_HITS: int = 3  # Best matching segments returned per video
+    VIDEO_SEARCH_FRAGMENT_SIZE: int = 150  # Characters per segment highlight
+    # Tiered search: the exact phrase/term tier is kept when it finds at least this many
+    # videos with a top score of at least this much, otherwise the fuzzy tier runs
+    VIDEO_SEARCH_EXACT_MIN_HITS: int = 3
+    VIDEO_SEARCH_EXACT_MIN_SCORE: float = 1.0
+    # Incremental sync of committed video/tag/skill changes (see app/services/video_sync.py)
+    ELASTICSEARCH_SYNC_ENABLED: bool = True
+    ELASTICSEARCH_SYNC_INTERVAL_MS: int = 300
+    ELASTICSEARCH_SYNC_BATCH_SIZE: int = 500  # Queued changes applied per bulk request
+    # Single-document writes: "false" (visible after the next periodic refresh),
+    # "wait_for" (return once visible) or "true" (force a refresh; expensive)
+    ELASTICSEARCH_WRITE_REFRESH: str = "false"
+    # Buffered writes are sent as one bulk request per this many operations or flush interval
+    ELASTICSEARCH_WRITE_BUFFER_SIZE: int = 500
+    ELASTICSEARCH_WRITE_BUFFER_FLUSH_MS: int = 1000
+    # Operations kept while Elasticsearch is unreachable; the oldest are dropped beyond this
+    ELASTICSEARCH_WRITE_BUFFER_MAX_SIZE: int = 10000
 
     # Session Configuration
     SESSION_SECRET_KEY: SecretStr = SecretStr("your-super-secret-key")
@@ -84,6 +168,45 @@ class Settings(BaseSettings):
     VIDEO_SEARCH_API_URL: str = "http://109.237.68.137:80"
     VIDEO_SEARCH_API_KEY: Optional[str] = None
     VIDEO_SEARCH_MOCK_DATA: bool = True  # Use mock data in development
+    # Connection pool of the long-lived retriever client
+    VIDEO_SEARCH_API_MAX_CONNECTIONS: int = 20
+    VIDEO_SEARCH_API_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    VIDEO_SEARCH_API_KEEPALIVE_EXPIRY_SECONDS: float = 30.0  # Idle connections are closed after this
+    VIDEO_SEARCH_API_HTTP2: bool = False  # Needs the h2 package (httpx[http2])
+    VIDEO_SEARCH_API_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    VIDEO_SEARCH_API_READ_TIMEOUT_SECONDS: float = 30.0
+    VIDEO_SEARCH_API_WRITE_TIMEOUT_SECONDS: float = 5.0
+    VIDEO_SEARCH_API_POOL_TIMEOUT_SECONDS: float = 5.0  # Wait for a free connection
+    # Circuit breaker: opens when this share of the last WINDOW calls (at least MIN_CALLS)
+    # failed or took SLOW_CALL_SECONDS or longer, and probes again after OPEN_SECONDS
+    VIDEO_SEARCH_API_BREAKER_WINDOW: int = 50
+    VIDEO_SEARCH_API_BREAKER_MIN_CALLS: int = 10
+    VIDEO_SEARCH_API_BREAKER_FAILURE_RATE: float = 0.5
+    VIDEO_SEARCH_API_BREAKER_SLOW_CALL_RATE: float = 0.8
+    VIDEO_SEARCH_API_SLOW_CALL_SECONDS: float = 5.0
+    VIDEO_SEARCH_API_BREAKER_OPEN_SECONDS: float = 30.0
+    VIDEO_SEARCH_API_BREAKER_HALF_OPEN_CALLS: int = 3  # Successful probes needed to close again
+    # AIMD limit on concurrent retriever calls; slow calls and failures halve it
+    VIDEO_SEARCH_API_CONCURRENCY_INITIAL: int = 10
+    VIDEO_SEARCH_API_CONCURRENCY_MIN: int = 1
+    VIDEO_SEARCH_API_CONCURRENCY_MAX: int = 20
+    # Hedging: when a query has not answered within the recent p90 latency, send a second
+    # attempt and use whichever answers first. Queries give up after the deadline either way
+    VIDEO_SEARCH_API_HEDGING_ENABLED: bool = False
+    VIDEO_SEARCH_API_HEDGE_PERCENTILE: float = 0.9
+    VIDEO_SEARCH_API_HEDGE_MIN_SAMPLES: int = 20  # No hedging until this many latencies were seen
+    VIDEO_SEARCH_API_LATENCY_WINDOW: int = 200  # Recent successful calls the percentile is taken over
+    VIDEO_SEARCH_API_DEADLINE_SECONDS: float = 30.0
+    # Last good content search results are kept this long past their hard TTL, for outages
+    VIDEO_CONTENT_SEARCH_STALE_SECONDS: int = 86400
+    # Content search results live from MIN_TTL (one-off queries) up to MAX_TTL
+    # (queries read HITS_FOR_MAX_TTL times recently)
+    VIDEO_CONTENT_SEARCH_MIN_TTL_SECONDS: int = 600
+    VIDEO_CONTENT_SEARCH_MAX_TTL_SECONDS: int = 86400
+    VIDEO_CONTENT_SEARCH_HITS_FOR_MAX_TTL: int = 50
+    VIDEO_CONTENT_SEARCH_STRIP_STOPWORDS: bool = False  # Also ignore stopwords in cache keys
+    VIDEO_CONTENT_SEARCH_BATCH_MAX_QUERIES: int = 50
+    VIDEO_CONTENT_SEARCH_BATCH_CONCURRENCY: int = 4  # Retriever calls in flight per batch
 
     # Email Configuration
     SMTP_TLS: bool = True
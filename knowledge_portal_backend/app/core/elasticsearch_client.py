@@ -1,17 +1,134 @@
 from elasticsearch import AsyncElasticsearch
 from elasticsearch.exceptions import ConnectionError, ConnectionTimeout, NotFoundError
 from app.core.config import get_settings
+from app.core.metrics import metrics
+from typing import Any, Dict, List, Optional, Tuple, Union
 import asyncio
 import logging
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Response paths search() keeps unless the caller asks for others
+DEFAULT_FILTER_PATH = ["hits.total", "hits.hits._id", "hits.hits._source", "hits.hits.sort",
+                       "aggregations", "suggest", "pit_id"]
+
+# refresh= values for writes: False/"false", "wait_for" or True/"true"
+RefreshPolicy = Union[bool, str]
+
+class BulkWriteBuffer:
+    """
+    Collects index and delete operations and sends them as bulk requests,
+    once ELASTICSEARCH_WRITE_BUFFER_SIZE operations are queued or every
+    ELASTICSEARCH_WRITE_BUFFER_FLUSH_MS, whichever comes first. A failed
+    flush keeps its operations queued for the next one, up to
+    ELASTICSEARCH_WRITE_BUFFER_MAX_SIZE; beyond that the oldest are dropped.
+    index() and delete() never raise; close() flushes whatever is left.
+    """
+    def __init__(self, client: "ElasticsearchClient"):
+        self.client = client
+        # (action, document) pairs; deletes have no document
+        self._operations: List[Tuple[Dict[str, Any], Optional[dict]]] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    async def index(self, index_name: str, document: dict, doc_id: str = None):
+        action = {"_index": index_name}
+        if doc_id is not None:
+            action["_id"] = doc_id
+        self._enqueue([({"index": action}, document)])
+        await self._flush_if_full()
+
+    async def delete(self, index_name: str, doc_id: str):
+        self._enqueue([({"delete": {"_index": index_name, "_id": doc_id}}, None)])
+        await self._flush_if_full()
+
+    def _enqueue(self, operations: List[Tuple[Dict[str, Any], Optional[dict]]], front: bool = False):
+        self._operations = operations + self._operations if front else self._operations + operations
+        overflow = len(self._operations) - settings.ELASTICSEARCH_WRITE_BUFFER_MAX_SIZE
+        if overflow > 0:
+            del self._operations[:overflow]
+            metrics.incr("elasticsearch.write_buffer.dropped", overflow)
+            logger.error(f"Write buffer is full; dropped the {overflow} oldest buffered Elasticsearch writes")
+
+    async def _flush_if_full(self):
+        # Writers wait for the bulk request, so a burst is sent rather than queued
+        if len(self) >= settings.ELASTICSEARCH_WRITE_BUFFER_SIZE:
+            try:
+                await self.flush()
+            except Exception:
+                pass  # Logged by flush(); the operations stay queued
+
+    async def flush(self) -> int:
+        """Send everything queued in one bulk request; returns the number of operations sent"""
+        async with self._lock:
+            operations, self._operations = self._operations, []
+            if not operations:
+                return 0
+            try:
+                if not self.client.es_client:
+                    await self.client.init()
+                lines: List[dict] = []
+                for action, document in operations:
+                    lines.append(action)
+                    if document is not None:
+                        lines.append(document)
+                response = await self.client.es_client.bulk(
+                    operations=lines, refresh=settings.ELASTICSEARCH_WRITE_REFRESH
+                )
+            except Exception as e:
+                self._enqueue(operations, front=True)
+                metrics.incr("elasticsearch.write_buffer.flush_failures")
+                logger.warning(f"Bulk flush of {len(operations)} buffered operations failed, will retry: {e}")
+                raise
+
+            items = response.get("items", [])
+            metrics.incr("elasticsearch.write_buffer.operations", len(items))
+            if response.get("errors"):
+                for item in items:
+                    (action, outcome), = item.items()
+                    # Deleting a document that is already gone is fine
+                    if "error" in outcome and not (action == "delete" and outcome.get("status") == 404):
+                        metrics.incr("elasticsearch.write_buffer.failures")
+                        logger.error(f"Buffered {action} of {outcome.get('_id')} in {outcome.get('_index')} failed: {outcome['error']}")
+            return len(items)
+
+    async def _run(self):
+        interval = settings.ELASTICSEARCH_WRITE_BUFFER_FLUSH_MS / 1000
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass  # Logged by flush(); the operations stay queued
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Dropped {len(self)} buffered Elasticsearch writes at shutdown: {e}")
+
 class ElasticsearchClient:
     def __init__(self):
         self.es_client = None
         self.max_retries = 5
         self.retry_delay = 5  # seconds
+        # Opt-in batching for index_document/delete_document(buffered=True)
+        self.write_buffer = BulkWriteBuffer(self)
 
     async def init(self):
         # Construct the full Elasticsearch URL
@@ -85,7 +202,22 @@ class ElasticsearchClient:
             logger.error(f"Error creating index {index_name}: {e}")
             raise
 
-    async def index_document(self, index_name: str, document: dict, doc_id: str = None):
+    async def index_document(
+        self,
+        index_name: str,
+        document: dict,
+        doc_id: str = None,
+        refresh: Optional[RefreshPolicy] = None,
+        buffered: bool = False
+    ):
+        """
+        Index one document. refresh defaults to ELASTICSEARCH_WRITE_REFRESH;
+        pass "wait_for" when the caller must read its own write. Buffered
+        writes are queued for the next bulk flush and return None.
+        """
+        if buffered:
+            await self.write_buffer.index(index_name, document, doc_id)
+            return None
         if not self.es_client:
             await self.init()
             
@@ -94,7 +226,7 @@ class ElasticsearchClient:
                 index=index_name,
                 document=document,
                 id=doc_id,
-                refresh=True  # Make the document immediately searchable
+                refresh=settings.ELASTICSEARCH_WRITE_REFRESH if refresh is None else refresh
             )
             logger.debug(f"Indexed document in {index_name}: {result}")
             return result
@@ -102,26 +234,84 @@ class ElasticsearchClient:
             logger.error(f"Error indexing document in {index_name}: {e}")
             raise
 
-    async def search(self, index_name: str, query: dict):
+    async def search(
+        self,
+        index_name: str,
+        query: dict,
+        source_includes: Optional[List[str]] = None,
+        source_excludes: Optional[List[str]] = None,
+        filter_path: Optional[List[str]] = None
+    ):
+        """
+        Run query against index_name. Queries with a "pit" (point in time)
+        clause already name their index and are sent without one; for them
+        a NotFoundError means the point in time expired and is re-raised.
+
+        source_includes/source_excludes project each hit's _source, and
+        filter_path trims the response to the listed paths (by default
+        DEFAULT_FILTER_PATH, which drops _shards, took and hit metadata
+        such as _index). "hits.hits" is always present in the result, even
+        when filter_path removed it because nothing matched.
+        """
         if not self.es_client:
             await self.init()
             
         try:
             result = await self.es_client.search(
-                index=index_name,
+                index=None if "pit" in query else index_name,
                 body=query,
+                source_includes=source_includes,
+                source_excludes=source_excludes,
+                filter_path=filter_path or DEFAULT_FILTER_PATH,
                 allow_partial_search_results=True  # Allow partial results if some shards fail
             )
+            result = result.body
+            result.setdefault("hits", {}).setdefault("hits", [])
             logger.debug(f"Search in {index_name} returned {len(result['hits']['hits'])} results")
             return result
         except NotFoundError:
+            if "pit" in query:
+                raise
             logger.warning(f"Index {index_name} not found")
             return {"hits": {"total": {"value": 0}, "hits": []}}
         except Exception as e:
             logger.error(f"Error searching in {index_name}: {e}")
             raise
 
-    async def delete_document(self, index_name: str, doc_id: str):
+    async def open_point_in_time(self, index_name: str, keep_alive: str) -> str:
+        if not self.es_client:
+            await self.init()
+
+        try:
+            result = await self.es_client.open_point_in_time(index=index_name, keep_alive=keep_alive)
+            return result["id"]
+        except Exception as e:
+            logger.error(f"Error opening point in time on {index_name}: {e}")
+            raise
+
+    async def close_point_in_time(self, pit_id: str):
+        if not self.es_client:
+            await self.init()
+
+        try:
+            await self.es_client.close_point_in_time(id=pit_id)
+        except NotFoundError:
+            # Already expired
+            pass
+        except Exception as e:
+            logger.warning(f"Error closing point in time: {e}")
+
+    async def delete_document(
+        self,
+        index_name: str,
+        doc_id: str,
+        refresh: Optional[RefreshPolicy] = None,
+        buffered: bool = False
+    ):
+        """Delete one document; refresh and buffered work as for index_document()"""
+        if buffered:
+            await self.write_buffer.delete(index_name, doc_id)
+            return None
         if not self.es_client:
             await self.init()
             
@@ -129,7 +319,7 @@ class ElasticsearchClient:
             result = await self.es_client.delete(
                 index=index_name,
                 id=doc_id,
-                refresh=True  # Make the deletion immediately visible
+                refresh=settings.ELASTICSEARCH_WRITE_REFRESH if refresh is None else refresh
             )
             logger.debug(f"Deleted document {doc_id} from {index_name}")
             return result
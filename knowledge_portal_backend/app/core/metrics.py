@@ -0,0 +1,48 @@
+"""
+Process-local counters and gauges.
+
+Each uvicorn worker keeps its own numbers; they are exposed on /metrics so
+they can be scraped per worker and summed externally.
+"""
+from collections import defaultdict
+from typing import Dict
+import threading
+
+
+class Metrics:
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1):
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        """Set a gauge to an absolute value"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            if name in self._gauges:
+                return self._gauges[name]
+            return self._counters.get(name, 0)
+
+    def ratio(self, hits_name: str, misses_name: str) -> float:
+        """Return hits / (hits + misses), or 0.0 when nothing was recorded"""
+        hits = self.get(hits_name)
+        total = hits + self.get(misses_name)
+        return round(hits / total, 4) if total else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges)
+            }
+
+
+metrics = Metrics()
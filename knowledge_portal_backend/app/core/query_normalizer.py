@@ -0,0 +1,31 @@
+"""
+Canonical forms of free-text search queries, for cache keys.
+
+"Python Decorators", "python decorators " and "python  decorators!" all
+normalize to "python decorators", so they share one cache entry.
+"""
+import re
+import unicodedata
+
+# Common English function words, dropped when strip_stopwords is set
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "of", "on", "or", "the", "to", "what", "when", "where",
+    "which", "who", "why", "with"
+})
+
+# Punctuation separates words; + and # stay, so "c++" and "c#" keep their meaning
+_PUNCTUATION = re.compile(r"[^\w\s+#]+")
+
+
+def normalize_query(query: str, strip_stopwords: bool = False) -> str:
+    """
+    NFKC-normalize, case-fold, turn punctuation into spaces and collapse
+    whitespace. Accents are kept: they distinguish words in many languages.
+    A query made only of stopwords is kept as it is rather than emptied.
+    """
+    text = unicodedata.normalize("NFKC", query).casefold()
+    words = _PUNCTUATION.sub(" ", text).split()
+    if strip_stopwords:
+        words = [word for word in words if word not in STOPWORDS] or words
+    return " ".join(words)
@@ -0,0 +1,167 @@
+"""
+Per-route sliding-window rate limiting.
+
+Each request to a limited route costs one EVALSHA against Redis. Requests
+are counted per authenticated user (the JWT subject) or, for anonymous
+requests, per client IP. Rejected requests get a 429 with Retry-After;
+allowed ones carry X-RateLimit-Limit/Remaining headers. Endpoints that fan
+out into work another rule limits charge it with charge().
+"""
+from typing import List, Optional, Tuple
+import logging
+import math
+
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis_client import redis_client
+from app.core.security import ALGORITHM
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitRule(BaseModel):
+    name: str
+    method: str
+    path: str
+    limit: int
+    window_seconds: int = 60
+
+
+def default_rules() -> List[RateLimitRule]:
+    api = settings.API_V1_STR
+    return [
+        RateLimitRule(name="login", method="POST", path=f"{api}/auth/login",
+                      limit=settings.RATE_LIMIT_LOGIN_PER_MINUTE),
+        RateLimitRule(name="google_login", method="POST", path=f"{api}/auth/google/login",
+                      limit=settings.RATE_LIMIT_LOGIN_PER_MINUTE),
+        RateLimitRule(name="quiz_generate", method="POST", path=f"{api}/quizzes/generate",
+                      limit=settings.RATE_LIMIT_QUIZ_GENERATE_PER_MINUTE),
+        RateLimitRule(name="content_search", method="POST", path=f"{api}/video-content-search/query",
+                      limit=settings.RATE_LIMIT_CONTENT_SEARCH_PER_MINUTE),
+        RateLimitRule(name="content_search_batch", method="POST", path=f"{api}/video-content-search/batch",
+                      limit=settings.RATE_LIMIT_CONTENT_SEARCH_BATCH_PER_MINUTE),
+    ]
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def client_identity(scope: Scope) -> str:
+    """The JWT subject for authenticated requests, otherwise the client IP"""
+    authorization = _header(scope, b"authorization")
+    if authorization and authorization.lower().startswith("bearer "):
+        try:
+            payload = jwt.decode(
+                authorization[7:], settings.SECRET_KEY.get_secret_value(), algorithms=[ALGORITHM]
+            )
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded_for = _header(scope, b"x-forwarded-for")
+        if forwarded_for:
+            return f"ip:{forwarded_for.split(',')[0].strip()}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def find_rule(name: str) -> RateLimitRule:
+    return next(rule for rule in default_rules() if rule.name == name)
+
+
+async def _hit(rule: RateLimitRule, identity: str, cost: int = 1) -> Optional[Tuple[bool, int, int]]:
+    """hit_sliding_window() for rule, or None if the limiter is unavailable"""
+    try:
+        if redis_client.redis_client is None:
+            # A request can arrive before the startup hook has connected
+            await redis_client.init()
+        return await redis_client.hit_sliding_window(
+            f"ratelimit:{rule.name}:{identity}",
+            rule.limit,
+            rule.window_seconds * 1000,
+            cost
+        )
+    except (RedisError, OSError) as e:
+        # Fail open: an unavailable limiter should not take the API down with it
+        logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+        return None
+
+
+async def charge(scope: Scope, rule: RateLimitRule, cost: int) -> Optional[int]:
+    """
+    Count cost requests against rule for the caller in scope. Returns None
+    if they are allowed, otherwise the seconds to wait before retrying.
+    """
+    if not settings.RATE_LIMIT_ENABLED or cost <= 0:
+        return None
+    result = await _hit(rule, client_identity(scope), cost)
+    if result is None or result[0]:
+        return None
+    metrics.incr(f"rate_limit.{rule.name}.rejected")
+    return max(1, math.ceil(result[2] / 1000))
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, rules: Optional[List[RateLimitRule]] = None):
+        self.app = app
+        self.rules = {(rule.method, rule.path): rule for rule in (rules or default_rules())}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        rule = None
+        if scope["type"] == "http" and settings.RATE_LIMIT_ENABLED:
+            rule = self.rules.get((scope["method"], scope["path"].rstrip("/") or "/"))
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        result = await _hit(rule, client_identity(scope))
+        if result is None:
+            await self.app(scope, receive, send)
+            return
+        allowed, remaining, retry_after_ms = result
+
+        if not allowed:
+            metrics.incr(f"rate_limit.{rule.name}.rejected")
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers={
+                    "Retry-After": str(max(1, math.ceil(retry_after_ms / 1000))),
+                    **self._limit_headers(rule, 0)
+                }
+            )
+            await response(scope, receive, send)
+            return
+
+        metrics.incr(f"rate_limit.{rule.name}.allowed")
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.extend(
+                    (name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in self._limit_headers(rule, remaining).items()
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    @staticmethod
+    def _limit_headers(rule: RateLimitRule, remaining: int) -> dict:
+        return {
+            "X-RateLimit-Limit": str(rule.limit),
+            "X-RateLimit-Remaining": str(remaining)
+        }
@@ -1,14 +1,171 @@
 import redis.asyncio as redis
+from redis.exceptions import RedisError
+from app.core.cache_codec import CacheCodec
 from app.core.config import get_settings
-import json
-from typing import Optional, Any
+from app.core.metrics import metrics
+from collections import OrderedDict
+import asyncio
+import logging
+import time
+from typing import Optional, Any, Dict, List, Sequence, Tuple
 import uuid
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Marks a cached "not found" result (see RedisClient.tombstone)
+TOMBSTONE_FIELD = "__missing__"
+
+# Delete a lock only if it still holds our token, so an expired lease
+# re-acquired by another worker is never released by us
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+# Delete all keys registered in the given tag sets (KEYS) along with the sets,
+# announcing each key on the L1 invalidation channel (ARGV[1], may be empty)
+INVALIDATE_TAGS_SCRIPT = """
+local invalidated = {}
+for _, tag in ipairs(KEYS) do
+    local members = redis.call("SMEMBERS", tag)
+    for i = 1, #members, 500 do
+        redis.call("DEL", unpack(members, i, math.min(i + 499, #members)))
+    end
+    redis.call("DEL", tag)
+    for _, member in ipairs(members) do
+        if ARGV[1] ~= "" then
+            redis.call("PUBLISH", ARGV[1], ARGV[2] .. ":" .. member)
+        end
+        invalidated[#invalidated + 1] = member
+    end
+end
+return invalidated
+"""
+
+# Sliding-window log rate limiter. KEYS[1] is a sorted set of request
+# timestamps; ARGV is limit, window in ms, a unique member id and the
+# number of requests to record (the cost).
+# Uses the Redis server clock so workers on different hosts agree.
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[4])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call("ZREMRANGEBYSCORE", KEYS[1], 0, now - window)
+local count = redis.call("ZCARD", KEYS[1])
+if count + cost <= limit then
+    for i = 1, cost do
+        redis.call("ZADD", KEYS[1], now, ARGV[3] .. ":" .. i)
+    end
+    redis.call("PEXPIRE", KEYS[1], window)
+    return {1, limit - count - cost, 0}
+end
+-- Wait until enough of the oldest requests have left the window
+local oldest = redis.call("ZRANGE", KEYS[1], count + cost - limit - 1, count + cost - limit - 1, "WITHSCORES")
+if not oldest[2] then
+    return {0, 0, window}
+end
+return {0, 0, tonumber(oldest[2]) + window - now}
+"""
+
+# Register ARGV[1] in each tag set of KEYS; ARGV[2] is the key's TTL in
+# seconds, 0 for none. A tag set lives as long as its longest-lived key, so
+# a set that is already persistent never gets a TTL.
+ADD_TAGS_SCRIPT = """
+local expire = tonumber(ARGV[2])
+for _, tag in ipairs(KEYS) do
+    local existed = redis.call("EXISTS", tag) == 1
+    redis.call("SADD", tag, ARGV[1])
+    if expire == 0 then
+        redis.call("PERSIST", tag)
+    elseif not existed then
+        redis.call("EXPIRE", tag, expire)
+    else
+        local ttl = redis.call("TTL", tag)
+        if ttl >= 0 and ttl < expire then
+            redis.call("EXPIRE", tag, expire)
+        end
+    end
+end
+return 1
+"""
+
+# Partial session update. KEYS[1] is the session hash; ARGV is the TTL in
+# seconds followed by field/value pairs. Returns 0 if the session is gone.
+UPDATE_SESSION_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 0 then
+    return 0
+end
+redis.call("HSET", KEYS[1], unpack(ARGV, 2))
+redis.call("EXPIRE", KEYS[1], ARGV[1])
+return 1
+"""
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with per-prefix TTLs.
+
+    Values are stored decoded and handed out as-is, so callers must treat
+    them as read-only.
+    """
+    def __init__(self, max_entries: int, prefix_ttls: Dict[str, int]):
+        self.max_entries = max_entries
+        # Longest prefix first so the most specific TTL wins
+        self.prefix_ttls = sorted(prefix_ttls.items(), key=lambda item: len(item[0]), reverse=True)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def ttl_for(self, key: str) -> int:
+        for prefix, ttl in self.prefix_ttls:
+            if key.startswith(prefix):
+                return ttl
+        return 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: str, value: Any):
+        ttl = self.ttl_for(key)
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            metrics.incr("cache.l1.evictions")
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
 class RedisClient:
     def __init__(self):
         self.redis_client = None
+        self.codec = CacheCodec(
+            serializer=settings.CACHE_SERIALIZER,
+            compression=settings.CACHE_COMPRESSION,
+            compression_min_bytes=settings.CACHE_COMPRESSION_MIN_BYTES
+        )
+        self.local_cache: Optional[LocalCache] = None
+        # Identifies this worker on the invalidation channel so it can skip its own messages
+        self.instance_id = uuid.uuid4().hex
+        self._invalidation_task: Optional[asyncio.Task] = None
 
     async def init(self):
         # Create Redis connection config
@@ -16,7 +173,8 @@ class RedisClient:
             "host": settings.REDIS_HOST,
             "port": settings.REDIS_PORT,
             "db": settings.REDIS_DB,
-            "decode_responses": True
+            # Cache values are binary (see CacheCodec); text replies are decoded where needed
+            "decode_responses": False
         }
         
         # Add password only if it's set
@@ -24,12 +182,85 @@ class RedisClient:
             redis_config["password"] = settings.REDIS_PASSWORD
 
         self.redis_client = redis.Redis(**redis_config)
+        self._release_lock_script = self.redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self._invalidate_tags_script = self.redis_client.register_script(INVALIDATE_TAGS_SCRIPT)
+        self._add_tags_script = self.redis_client.register_script(ADD_TAGS_SCRIPT)
+        self._sliding_window_script = self.redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+        self._update_session_script = self.redis_client.register_script(UPDATE_SESSION_SCRIPT)
+
+        if settings.LOCAL_CACHE_ENABLED:
+            self.local_cache = LocalCache(settings.LOCAL_CACHE_MAX_ENTRIES, settings.LOCAL_CACHE_TTLS)
+            self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
 
     async def close(self):
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            try:
+                await self._invalidation_task
+            except asyncio.CancelledError:
+                pass
+            self._invalidation_task = None
         if self.redis_client:
             await self.redis_client.close()
 
+    # Local (L1) cache invalidation
+    async def _listen_for_invalidations(self):
+        """Evict keys changed by other workers, reconnecting on failure"""
+        channel = settings.CACHE_INVALIDATION_CHANNEL
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(channel)
+                # Messages may have been missed while disconnected
+                self.local_cache.clear()
+                logger.info(f"Subscribed to cache invalidation channel: {channel}")
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    origin, _, key = message["data"].decode().partition(":")
+                    if origin != self.instance_id:
+                        self.local_cache.delete(key)
+                        metrics.incr("cache.l1.remote_invalidations")
+            except asyncio.CancelledError:
+                raise
+            except RedisError as e:
+                logger.warning(f"Cache invalidation listener error: {e}. Reconnecting in 1 second...")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+    def _invalidation_message(self, key: str) -> str:
+        return f"{self.instance_id}:{key}"
+
+    def cache_stats(self) -> dict:
+        """Hit counters and ratios for the local and Redis tiers"""
+        return {
+            "l1": {
+                "enabled": self.local_cache is not None,
+                "size": len(self.local_cache) if self.local_cache is not None else 0,
+                "hits": metrics.get("cache.l1.hits"),
+                "misses": metrics.get("cache.l1.misses"),
+                "hit_ratio": metrics.ratio("cache.l1.hits", "cache.l1.misses"),
+                "evictions": metrics.get("cache.l1.evictions")
+            },
+            "redis": {
+                "hits": metrics.get("cache.redis.hits"),
+                "misses": metrics.get("cache.redis.misses"),
+                "hit_ratio": metrics.ratio("cache.redis.hits", "cache.redis.misses")
+            }
+        }
+
     # Session Management
+    # Sessions are Redis hashes with one codec-encoded value per field, so
+    # updates touch only the changed fields and reads refresh the TTL
+    # (sliding expiration) without rewriting any data.
+    @staticmethod
+    def _session_ttl() -> int:
+        return settings.SESSION_EXPIRE_MINUTES * 60
+
+    def _encode_session_fields(self, data: dict) -> Dict[str, bytes]:
+        return {field: self.codec.encode(value) for field, value in data.items()}
+
     async def create_session(self, user_id: int, data: dict) -> str:
         session_id = str(uuid.uuid4())
         session_key = f"session:{session_id}"
@@ -37,21 +268,52 @@ class RedisClient:
             "user_id": user_id,
             **data
         }
-        await self.set_json(session_key, session_data, expire=settings.SESSION_EXPIRE_MINUTES * 60)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(session_key, mapping=self._encode_session_fields(session_data))
+            pipe.expire(session_key, self._session_ttl())
+            await pipe.execute()
         return session_id
 
     async def get_session(self, session_id: str) -> Optional[dict]:
         session_key = f"session:{session_id}"
-        return await self.get_json(session_key)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(session_key)
+            pipe.expire(session_key, self._session_ttl())
+            fields, _ = await pipe.execute()
+        if not fields:
+            return None
+        return {field.decode(): self.codec.decode(value) for field, value in fields.items()}
+
+    async def get_session_fields(self, session_id: str, *fields: str) -> Optional[dict]:
+        """Read selected session fields; missing fields are returned as None"""
+        session_key = f"session:{session_id}"
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hmget(session_key, fields)
+            pipe.expire(session_key, self._session_ttl())
+            values, exists = await pipe.execute()
+        if not exists:
+            return None
+        return {
+            field: self.codec.decode(value) if value is not None else None
+            for field, value in zip(fields, values)
+        }
 
     async def update_session(self, session_id: str, data: dict) -> bool:
+        """Atomically set the given fields if the session still exists"""
+        if not data:
+            return await self.touch_session(session_id)
         session_key = f"session:{session_id}"
-        current_session = await self.get_json(session_key)
-        if current_session:
-            current_session.update(data)
-            await self.set_json(session_key, current_session, expire=settings.SESSION_EXPIRE_MINUTES * 60)
-            return True
-        return False
+        field_values = [item for pair in self._encode_session_fields(data).items() for item in pair]
+        updated = await self._update_session_script(
+            keys=[session_key],
+            args=[self._session_ttl(), *field_values]
+        )
+        return bool(updated)
+
+    async def touch_session(self, session_id: str) -> bool:
+        """Extend a session's TTL without reading or rewriting it"""
+        session_key = f"session:{session_id}"
+        return bool(await self.redis_client.expire(session_key, self._session_ttl()))
 
     async def delete_session(self, session_id: str) -> bool:
         session_key = f"session:{session_id}"
@@ -62,17 +324,185 @@ class RedisClient:
         await self.redis_client.set(key, value, ex=expire)
 
     async def get_data(self, key: str) -> str:
-        return await self.redis_client.get(key)
+        data = await self.redis_client.get(key)
+        return data.decode() if data is not None else None
 
     async def delete_data(self, key: str) -> bool:
-        return await self.redis_client.delete(key) > 0
+        if self.local_cache is None:
+            return await self.redis_client.delete(key) > 0
+
+        self.local_cache.delete(key)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.delete(key)
+            pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, self._invalidation_message(key))
+            deleted, _ = await pipe.execute()
+        return deleted > 0
+
+    async def set_json(self, key: str, value: dict, expire: int = None, tags: Optional[Sequence[str]] = None):
+        if self.local_cache is None and not tags:
+            await self.redis_client.set(key, self.codec.encode(value), ex=expire)
+            return
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(key, self.codec.encode(value), ex=expire)
+            await self._add_tags(pipe, key, tags, expire)
+            if self.local_cache is not None:
+                pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, self._invalidation_message(key))
+            await pipe.execute()
+        if self.local_cache is not None:
+            self.local_cache.set(key, value)
 
-    async def set_json(self, key: str, value: dict, expire: int = None):
-        await self.redis_client.set(key, json.dumps(value), ex=expire)
+    def _get_local(self, key: str) -> Tuple[bool, bool, Any]:
+        """Look a key up in the local tier; returns (cacheable, hit, value)"""
+        if self.local_cache is None or self.local_cache.ttl_for(key) <= 0:
+            return False, False, None
+        hit, value = self.local_cache.get(key)
+        metrics.incr("cache.l1.hits" if hit else "cache.l1.misses")
+        return True, hit, value
+
+    def _decode_json(self, key: str, data: Optional[bytes], cacheable: bool) -> Optional[Any]:
+        metrics.incr("cache.redis.hits" if data else "cache.redis.misses")
+        if not data:
+            return None
+        value = self.codec.decode(data)
+        if cacheable:
+            self.local_cache.set(key, value)
+        return value
 
     async def get_json(self, key: str) -> Optional[dict]:
+        cacheable, hit, value = self._get_local(key)
+        if hit:
+            return value
         data = await self.redis_client.get(key)
-        return json.loads(data) if data else None
+        return self._decode_json(key, data, cacheable)
+
+    async def get_json_with_ttl(self, key: str) -> Tuple[Optional[Any], Optional[int]]:
+        """
+        Return (value, remaining TTL in milliseconds) in one round trip.
+        The TTL is None for local-tier hits and for keys without an expiry.
+        """
+        cacheable, hit, value = self._get_local(key)
+        if hit:
+            return value, None
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            data, ttl_ms = await pipe.execute()
+        value = self._decode_json(key, data, cacheable)
+        return value, ttl_ms if ttl_ms >= 0 else None
+
+    # Distributed Locks
+    async def acquire_lock(self, key: str, token: str, ttl_ms: int) -> bool:
+        """Take a lease on key with SET NX; it expires by itself after ttl_ms"""
+        return bool(await self.redis_client.set(key, token, nx=True, px=ttl_ms))
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        return bool(await self._release_lock_script(keys=[key], args=[token]))
+
+    # Batched Cache Access
+    async def get_many_json(self, keys: List[str]) -> List[Optional[Any]]:
+        """Fetch several JSON values with a single MGET, in the order of keys"""
+        results: List[Optional[Any]] = [None] * len(keys)
+        pending: List[Tuple[int, bool]] = []
+        for index, key in enumerate(keys):
+            cacheable, hit, value = self._get_local(key)
+            if hit:
+                results[index] = value
+            else:
+                pending.append((index, cacheable))
+
+        if pending:
+            values = await self.redis_client.mget([keys[index] for index, _ in pending])
+            for (index, cacheable), data in zip(pending, values):
+                results[index] = self._decode_json(keys[index], data, cacheable)
+        return results
+
+    async def set_many_json(self, mapping: Dict[str, Any], expire: int = None, tags: Optional[Sequence[str]] = None):
+        """Store several JSON values with one pipelined round trip"""
+        if not mapping:
+            return
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, self.codec.encode(value), ex=expire)
+                await self._add_tags(pipe, key, tags, expire)
+                if self.local_cache is not None:
+                    pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, self._invalidation_message(key))
+            await pipe.execute()
+
+        if self.local_cache is not None:
+            for key, value in mapping.items():
+                self.local_cache.set(key, value)
+
+    # Tag-based Invalidation
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"tag:{tag}"
+
+    async def _add_tags(self, pipe, key: str, tags: Optional[Sequence[str]], expire: Optional[int]):
+        """Queue registration of key in each tag set, keeping the set alive as long as its longest-lived key"""
+        if tags:
+            await self._add_tags_script(
+                keys=[self._tag_key(tag) for tag in tags], args=[key, expire or 0], client=pipe
+            )
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Delete every key registered under the given tags, atomically and in one round trip"""
+        if not tags:
+            return 0
+        channel = settings.CACHE_INVALIDATION_CHANNEL if self.local_cache is not None else ""
+        keys = await self._invalidate_tags_script(
+            keys=[self._tag_key(tag) for tag in tags],
+            args=[channel, self.instance_id]
+        )
+        if self.local_cache is not None:
+            for key in keys:
+                self.local_cache.delete(key.decode())
+        metrics.incr("cache.tags.invalidated_keys", len(keys))
+        return len(keys)
+
+    # Negative Caching
+    # A tombstone stored under an entity's cache key records that the entity
+    # does not exist, so repeated lookups of a missing id skip the database
+    # for NEGATIVE_CACHE_TTL_SECONDS. Creating the entity overwrites or
+    # deletes the tombstone. These helpers fail open: a Redis error reads as
+    # "not known to be missing".
+    @staticmethod
+    def tombstone(detail: Optional[str] = None) -> dict:
+        return {TOMBSTONE_FIELD: detail}
+
+    @staticmethod
+    def is_tombstone(value: Any) -> bool:
+        return isinstance(value, dict) and TOMBSTONE_FIELD in value
+
+    async def mark_missing(self, key: str, detail: Optional[str] = None):
+        if not settings.NEGATIVE_CACHE_ENABLED:
+            return
+        try:
+            await self.set_json(key, self.tombstone(detail), expire=settings.NEGATIVE_CACHE_TTL_SECONDS)
+            metrics.incr("cache.negative.stored")
+        except RedisError as e:
+            logger.warning(f"Could not store tombstone for {key}: {e}")
+
+    async def is_known_missing(self, key: str) -> bool:
+        if not settings.NEGATIVE_CACHE_ENABLED:
+            return False
+        try:
+            missing = self.is_tombstone(await self.get_json(key))
+        except RedisError as e:
+            logger.warning(f"Could not read tombstone for {key}: {e}")
+            return False
+        if missing:
+            metrics.incr("cache.negative.hits")
+        return missing
+
+    async def clear_missing(self, *keys: str):
+        """Drop tombstones (and any stale entries) for entities that now exist"""
+        try:
+            for key in keys:
+                await self.delete_data(key)
+        except RedisError as e:
+            logger.warning(f"Could not clear tombstones {keys}: {e}")
 
     # Frequently Accessed Data Caching
     async def cache_video(self, video_id: str, video_data: dict, expire: int = 3600):
@@ -104,10 +534,24 @@ class RedisClient:
 
     # Rate Limiting
     async def increment_request_count(self, key: str, window: int = 60) -> int:
-        """Increment request count for rate limiting"""
-        count = await self.redis_client.incr(key)
-        if count == 1:
-            await self.redis_client.expire(key, window)
+        """Increment a fixed-window request count; INCR and EXPIRE run in one transaction"""
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, window, nx=True)
+            count, _ = await pipe.execute()
         return count
 
+    async def hit_sliding_window(
+        self, key: str, limit: int, window_ms: int, cost: int = 1
+    ) -> Tuple[bool, int, int]:
+        """
+        Record cost requests in a sliding-window log with a single EVALSHA.
+        Returns (allowed, remaining, retry_after_ms); rejected requests are not recorded.
+        """
+        allowed, remaining, retry_after_ms = await self._sliding_window_script(
+            keys=[key],
+            args=[limit, window_ms, uuid.uuid4().hex, cost]
+        )
+        return bool(allowed), remaining, retry_after_ms
+
 redis_client = RedisClient() 
\ No newline at end of file
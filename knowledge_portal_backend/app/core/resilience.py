@@ -0,0 +1,233 @@
+"""
+Failure isolation for calls to external services.
+
+CircuitBreaker tracks the outcome and latency of the last calls. When too
+many of them fail or are slow it opens and rejects calls immediately for a
+while, then lets a few probe calls through (half-open) and closes again if
+they succeed. AdaptiveConcurrencyLimiter bounds the calls in flight with an
+AIMD limit: every fast success raises it a little, every failure or slow
+call cuts it by a factor, so a slowing dependency gets less concurrency
+instead of a growing queue.
+
+    guard = ResilienceGuard(CircuitBreaker("retriever", ...), AdaptiveConcurrencyLimiter(...))
+    async with guard.call():
+        response = await client.post(...)
+
+Rejected calls raise CallRejectedError without touching the service. State
+is per worker, like app.core.metrics.
+"""
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Tuple
+import logging
+import math
+import time
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Every guard, by breaker name, for /health
+guards: Dict[str, "ResilienceGuard"] = {}
+
+
+class CallRejectedError(Exception):
+    """The call was not attempted; retry_after is a hint in seconds"""
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(CallRejectedError):
+    pass
+
+
+class ConcurrencyLimitError(CallRejectedError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window: int,
+        min_calls: int,
+        failure_rate: float,
+        slow_call_seconds: float,
+        slow_call_rate: float,
+        open_seconds: float,
+        half_open_calls: int
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        # (failed, slow) for the most recent calls
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        # Bumped on every transition; results of calls admitted under an earlier one are ignored
+        self._generation = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: str):
+        logger.warning(f"Circuit breaker {self.name}: {self._state} -> {state}")
+        self._state = state
+        self._generation += 1
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._outcomes.clear()
+        metrics.incr(f"circuit_breaker.{self.name}.{state}")
+        metrics.set_gauge(f"circuit_breaker.{self.name}.open", 1 if state == OPEN else 0)
+
+    def retry_after(self) -> float:
+        return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def before_call(self) -> int:
+        """
+        Raise CircuitOpenError unless a call may go through now. Returns
+        the generation to pass to record() or cancel_call() for this call.
+        """
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._probes_in_flight >= self.half_open_calls):
+            metrics.incr(f"circuit_breaker.{self.name}.rejected")
+            raise CircuitOpenError(f"Circuit breaker {self.name} is open", self.retry_after())
+        if state == HALF_OPEN:
+            self._probes_in_flight += 1
+        return self._generation
+
+    def cancel_call(self, generation: int):
+        """Undo before_call() for a call that was not made after all"""
+        if generation == self._generation and self._state == HALF_OPEN and self._probes_in_flight:
+            self._probes_in_flight -= 1
+
+    def record(self, success: bool, seconds: float, generation: int):
+        if generation != self._generation:
+            # Admitted before the last transition, e.g. a slow call that outlived
+            # the open period must not count as a half-open probe
+            return
+        slow = seconds >= self.slow_call_seconds
+        if self._state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if not success or slow:
+                self._transition(OPEN)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._transition(CLOSED)
+            return
+
+        self._outcomes.append((not success, slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self._outcomes if failed)
+        slow_calls = sum(1 for _, slow_call in self._outcomes if slow_call)
+        if (failures / len(self._outcomes) >= self.failure_rate
+                or slow_calls / len(self._outcomes) >= self.slow_call_rate):
+            self._transition(OPEN)
+
+    def snapshot(self) -> dict:
+        state = self.state
+        calls = len(self._outcomes)
+        return {
+            "state": state,
+            "calls": calls,
+            "failure_rate": round(sum(1 for failed, _ in self._outcomes if failed) / calls, 4) if calls else 0.0,
+            "slow_call_rate": round(sum(1 for _, slow in self._outcomes if slow) / calls, 4) if calls else 0.0,
+            "retry_after": round(self.retry_after(), 1) if state == OPEN else 0
+        }
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        slow_call_seconds: float,
+        backoff: float = 0.5
+    ):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.slow_call_seconds = slow_call_seconds
+        self.backoff = backoff
+        self.limit = float(initial)
+        self.in_flight = 0
+
+    def acquire(self):
+        """Take a slot or raise ConcurrencyLimitError; callers are not queued"""
+        if self.in_flight >= math.floor(self.limit):
+            metrics.incr(f"concurrency_limit.{self.name}.rejected")
+            raise ConcurrencyLimitError(f"Too many concurrent {self.name} calls", retry_after=1)
+        self.in_flight += 1
+
+    def release(self, success: bool, seconds: float):
+        self.in_flight -= 1
+        if success and seconds < self.slow_call_seconds:
+            # Additive increase: about +1 per limit's worth of good calls
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        else:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+        metrics.set_gauge(f"concurrency_limit.{self.name}.limit", round(self.limit, 2))
+
+    def snapshot(self) -> dict:
+        return {"limit": math.floor(self.limit), "in_flight": self.in_flight}
+
+
+class ResilienceGuard:
+    def __init__(self, breaker: CircuitBreaker, limiter: AdaptiveConcurrencyLimiter):
+        self.breaker = breaker
+        self.limiter = limiter
+        guards[breaker.name] = self
+
+    @asynccontextmanager
+    async def call(self) -> AsyncIterator[None]:
+        """
+        Guard one call. An exception raised inside the block counts as a
+        failure; cancellation (e.g. the client went away) frees the slot
+        without counting either way.
+        """
+        generation = self.breaker.before_call()
+        try:
+            self.limiter.acquire()
+        except CallRejectedError:
+            self.breaker.cancel_call(generation)
+            raise
+
+        started = time.monotonic()
+        try:
+            yield
+        except Exception:
+            seconds = time.monotonic() - started
+            self.limiter.release(False, seconds)
+            self.breaker.record(False, seconds, generation)
+            raise
+        except BaseException:
+            self.limiter.in_flight -= 1
+            self.breaker.cancel_call(generation)
+            raise
+        seconds = time.monotonic() - started
+        self.limiter.release(True, seconds)
+        self.breaker.record(True, seconds, generation)
+
+    def snapshot(self) -> dict:
+        return {**self.breaker.snapshot(), "concurrency": self.limiter.snapshot()}
@@ -0,0 +1,335 @@
+"""
+Declarative response caching for read endpoints.
+
+    @router.get("/{quiz_id}", response_model=Quiz)
+    @cached_response(cache_key("quiz", "quiz_id"), soft_ttl=3600, hard_ttl=86400)
+    async def get_quiz_by_id(quiz_id: int, db: AsyncSession = Depends(get_db)):
+        ...
+
+Entries younger than soft_ttl are served as-is. Older entries are still
+served, but trigger a background refresh (stale-while-revalidate). Redis
+drops entries after hard_ttl, and the next request reloads them through
+single-flight so concurrent misses share one load. A 404 raised by the
+endpoint is cached as a tombstone for NEGATIVE_CACHE_TTL_SECONDS and
+replayed without calling the endpoint. With serve_stale_for, the last good
+response outlives hard_ttl and is served when reloading fails with a 503.
+
+Reads of endpoints keyed with cache_key() are sampled into the cache
+warmer's popularity statistics, and the warmer can rebuild the endpoint's
+arguments from those key values to preload popular entries. The same
+statistics drive popularity_ttl(), which keeps hot entries longer than
+one-off ones.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Union
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import math
+import time
+import uuid
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from app.core.cache_warmer import cache_warmer
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.core.redis_client import TOMBSTONE_FIELD, redis_client
+from app.core.single_flight import single_flight
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+KeyBuilder = Callable[..., str]
+TagBuilder = Callable[..., Sequence[str]]
+# Builds an entry's hard TTL from the endpoint's arguments
+TtlBuilder = Callable[..., Awaitable[int]]
+
+# Keep references to background refreshes so they are not garbage collected mid-flight
+_refresh_tasks: Set[asyncio.Task] = set()
+# Keys this worker is already refreshing
+_refreshing_keys: Set[str] = set()
+
+
+def _lookup(kwargs: Dict[str, Any], path: str) -> Any:
+    name, *attrs = path.split(".")
+    value = kwargs[name]
+    for attr in attrs:
+        value = getattr(value, attr)
+    return value
+
+
+def _resolve(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump_json()
+    return value
+
+
+def cache_key(
+    prefix: str,
+    *params: str,
+    normalize: Optional[Dict[str, Callable[[Any], Any]]] = None
+) -> KeyBuilder:
+    """
+    Build keys as "prefix:value1:value2" from endpoint parameters. Params
+    name path, query or body arguments; dotted names read attributes of a
+    body model, e.g. cache_key("video_search", "search_query.query").
+    normalize maps params to functions that canonicalize their values, so
+    equivalent requests share a key.
+    """
+    normalize = normalize or {}
+
+    def values(**kwargs) -> List[Any]:
+        return [
+            normalize[param](_lookup(kwargs, param)) if param in normalize else _lookup(kwargs, param)
+            for param in params
+        ]
+
+    def build(**kwargs) -> str:
+        return ":".join([prefix, *(str(_resolve(value)) for value in values(**kwargs))])
+    # Read by cached_response to record and replay popular keys
+    build.prefix = prefix
+    build.params = params
+    build.values = values
+    return build
+
+
+def _popularity_member(key_builder: KeyBuilder, kwargs: Dict[str, Any]) -> str:
+    return json.dumps(jsonable_encoder(key_builder.values(**kwargs)))
+
+
+def popularity_ttl(key_builder: KeyBuilder, min_ttl: int, max_ttl: int, hits_for_max: int) -> TtlBuilder:
+    """
+    A hard_ttl for cached_response that grows with the key's recent reads,
+    as counted by the cache warmer (its group must be in CACHE_WARM_GROUPS):
+    min_ttl for a one-off, rising on a log scale to max_ttl at hits_for_max.
+    """
+    async def ttl(**kwargs) -> int:
+        try:
+            hits = await cache_warmer.popularity(key_builder.prefix, _popularity_member(key_builder, kwargs))
+        except RedisError:
+            hits = 0
+        # Not counting the read that caused this load
+        share = min(1.0, math.log1p(max(0.0, hits - 1)) / math.log1p(hits_for_max))
+        return int(min_ttl + (max_ttl - min_ttl) * share)
+    return ttl
+
+
+def _rebuild_kwargs(endpoint: Callable, params: Sequence[str], values: Sequence[Any]) -> Dict[str, Any]:
+    """Endpoint arguments for a recorded set of cache_key() values"""
+    signature = inspect.signature(endpoint)
+    kwargs: Dict[str, Any] = {}
+    models: Dict[str, Dict[str, Any]] = {}
+    for param, value in zip(params, values):
+        name, *attrs = param.split(".")
+        if attrs:
+            models.setdefault(name, {})[attrs[0]] = value
+        else:
+            kwargs[name] = value
+    for name, fields in models.items():
+        # Fields that are not part of the key take their defaults
+        kwargs[name] = signature.parameters[name].annotation(**fields)
+    return kwargs
+
+
+def _envelope(value: Any) -> dict:
+    return {"value": jsonable_encoder(value), "stored_at": time.time()}
+
+
+def _tombstone_envelope(detail: Any) -> dict:
+    return {**redis_client.tombstone(detail), "stored_at": time.time()}
+
+
+def _is_envelope(cached: Any) -> bool:
+    return isinstance(cached, dict) and "stored_at" in cached and (
+        "value" in cached or TOMBSTONE_FIELD in cached
+    )
+
+
+async def cached_values(
+    key_builder: KeyBuilder, kwargs_list: Sequence[Dict[str, Any]], soft_ttl: int
+) -> List[Optional[Any]]:
+    """
+    Fresh cached responses for several calls of one cached endpoint, read
+    with a single MGET and in order. None marks entries that are missing,
+    stale or tombstones; load those through the endpoint itself. Hits count
+    towards popularity like ordinary reads.
+    """
+    keys = [key_builder(**kwargs) for kwargs in kwargs_list]
+    envelopes = await redis_client.get_many_json(keys)
+    now = time.time()
+    values: List[Optional[Any]] = []
+    hits: List[Dict[str, Any]] = []
+    for kwargs, envelope in zip(kwargs_list, envelopes):
+        if _is_envelope(envelope) and not redis_client.is_tombstone(envelope) and now - envelope["stored_at"] < soft_ttl:
+            values.append(envelope["value"])
+            hits.append(kwargs)
+        else:
+            values.append(None)
+    if getattr(key_builder, "prefix", None) is not None and hits:
+        await cache_warmer.record_many(key_builder.prefix, [_popularity_member(key_builder, kwargs) for kwargs in hits])
+    return values
+
+
+async def prime_response(key: str, value: Any, hard_ttl: int, tags: Optional[Sequence[str]] = None):
+    """Store a freshly computed response, e.g. right after the entity was created"""
+    await redis_client.set_json(key, _envelope(value), expire=hard_ttl, tags=tags)
+
+
+def cached_response(
+    key_builder: KeyBuilder,
+    soft_ttl: int,
+    hard_ttl: Union[int, TtlBuilder],
+    db_param: Optional[str] = "db",
+    lease_ms: Optional[int] = None,
+    tags: Union[Sequence[str], TagBuilder, None] = None,
+    serve_stale_for: Optional[int] = None
+):
+    """
+    Cache an endpoint's JSON-encoded result under key_builder(**kwargs).
+
+    hard_ttl is a number of seconds, or an async function of the endpoint's
+    arguments that returns them, e.g. popularity_ttl().
+
+    tags lists the entities the response depends on (or is a callable that
+    builds them from the endpoint's arguments); redis_client.invalidate_tags()
+    on any of them drops the cached response.
+
+    Background refreshes outlive the request, so the database session passed
+    as db_param is replaced with a fresh one for them. lease_ms bounds how
+    long other workers wait on a miss before loading the key themselves;
+    set it above the endpoint's worst-case latency.
+
+    serve_stale_for keeps a copy of every good response for that many
+    seconds past hard_ttl (under "stale:{key}"); when the endpoint raises a
+    503, e.g. because a dependency's circuit breaker is open, that copy is
+    returned instead of the error.
+    """
+    def build_tags(kwargs: Dict[str, Any]) -> Sequence[str]:
+        return tags(**kwargs) if callable(tags) else (tags or ())
+
+    prefix = getattr(key_builder, "prefix", None)
+    params = getattr(key_builder, "params", None)
+
+    def expire_for(envelope: dict) -> int:
+        if redis_client.is_tombstone(envelope):
+            return settings.NEGATIVE_CACHE_TTL_SECONDS
+        # Computed by load() when hard_ttl is a function
+        return envelope.get("ttl", hard_ttl)
+
+    def decorator(endpoint: Callable[..., Awaitable[Any]]):
+        async def load(kwargs: Dict[str, Any]) -> dict:
+            try:
+                envelope = _envelope(await endpoint(**kwargs))
+            except HTTPException as e:
+                if e.status_code != 404 or not settings.NEGATIVE_CACHE_ENABLED:
+                    raise
+                return _tombstone_envelope(e.detail)
+            if callable(hard_ttl):
+                envelope["ttl"] = await hard_ttl(**kwargs)
+            if serve_stale_for:
+                try:
+                    await redis_client.set_json(
+                        f"stale:{key_builder(**kwargs)}", envelope,
+                        expire=expire_for(envelope) + serve_stale_for, tags=build_tags(kwargs)
+                    )
+                except RedisError as e:
+                    logger.warning(f"Could not keep a stale copy of {key_builder(**kwargs)}: {e}")
+            return envelope
+
+        async def load_stale(key: str) -> Optional[dict]:
+            try:
+                envelope = await redis_client.get_json(f"stale:{key}")
+            except RedisError:
+                return None
+            return envelope if _is_envelope(envelope) else None
+
+        async def warm(member: str):
+            kwargs = _rebuild_kwargs(endpoint, params, json.loads(member))
+            key = key_builder(**kwargs)
+            if await redis_client.redis_client.exists(key):
+                return
+            if db_param in inspect.signature(endpoint).parameters:
+                async with AsyncSessionLocal() as session:
+                    envelope = await load({**kwargs, db_param: session})
+            else:
+                envelope = await load(kwargs)
+            await redis_client.set_json(key, envelope, expire=expire_for(envelope), tags=build_tags(kwargs))
+
+        async def refresh(key: str, kwargs: Dict[str, Any]):
+            lock_key = f"lock:refresh:{key}"
+            token = uuid.uuid4().hex
+            try:
+                # One worker refreshes; the others keep serving the stale value
+                if not await redis_client.acquire_lock(lock_key, token, lease_ms or settings.CACHE_LOCK_TIMEOUT_MS):
+                    return
+                try:
+                    if db_param and db_param in kwargs:
+                        async with AsyncSessionLocal() as session:
+                            envelope = await load({**kwargs, db_param: session})
+                    else:
+                        envelope = await load(kwargs)
+                    await redis_client.set_json(key, envelope, expire=expire_for(envelope), tags=build_tags(kwargs))
+                    metrics.incr("cache.response.refreshes")
+                finally:
+                    await redis_client.release_lock(lock_key, token)
+            except Exception as e:
+                logger.warning(f"Background refresh of {key} failed: {e}")
+            finally:
+                _refreshing_keys.discard(key)
+
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            if not redis_client.redis_client:
+                await redis_client.init()
+
+            key = key_builder(**kwargs)
+            try:
+                if prefix is not None:
+                    await cache_warmer.record(prefix, _popularity_member(key_builder, kwargs))
+                envelope = await single_flight.get_or_load(
+                    key, lambda: load(kwargs), expire=expire_for, lease_ms=lease_ms, tags=build_tags(kwargs)
+                )
+                if not _is_envelope(envelope):
+                    # Written by the hand-rolled caching this decorator replaced
+                    envelope = await load(kwargs)
+                    try:
+                        await redis_client.set_json(key, envelope, expire=expire_for(envelope), tags=build_tags(kwargs))
+                    except RedisError as e:
+                        logger.warning(f"Could not cache {key}: {e}")
+            except RedisError as e:
+                # Raised before the endpoint ran: loads fail open on their own cache writes
+                logger.warning(f"Response cache unavailable for {key}: {e}")
+                return await endpoint(**kwargs)
+            except HTTPException as e:
+                if e.status_code != 503 or not serve_stale_for:
+                    raise
+                envelope = await load_stale(key)
+                if envelope is None:
+                    raise
+                metrics.incr("cache.response.stale_on_error")
+                return envelope["value"]
+
+            if redis_client.is_tombstone(envelope):
+                metrics.incr("cache.negative.hits")
+                raise HTTPException(status_code=404, detail=envelope[TOMBSTONE_FIELD])
+
+            if time.time() - envelope["stored_at"] >= soft_ttl:
+                metrics.incr("cache.response.stale_hits")
+                if key in _refreshing_keys:
+                    return envelope["value"]
+                _refreshing_keys.add(key)
+                task = asyncio.create_task(refresh(key, kwargs))
+                _refresh_tasks.add(task)
+                task.add_done_callback(_refresh_tasks.discard)
+            return envelope["value"]
+
+        if prefix is not None:
+            cache_warmer.register(prefix, warm)
+        return wrapper
+    return decorator
@@ -0,0 +1,153 @@
+"""
+Cache stampede protection for cache-miss paths.
+
+When a hot key expires, only one caller per worker runs the loader (the
+others await the same future), and only one worker at a time holds the
+Redis lease for the key while the rest poll the cache for its result.
+Keys that are close to expiry are refreshed early with a probability that
+grows as the TTL runs out (XFetch), so popular keys are usually recomputed
+before they ever miss.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Union
+import asyncio
+import logging
+import math
+import random
+import time
+import uuid
+
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.redis_client import redis_client
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[Any]]
+# Seconds to keep a loaded value, or a function of the value that returns them
+Expiry = Union[int, Callable[[Any], int]]
+
+
+class SingleFlight:
+    # Upper bound on remembered recompute durations
+    MAX_TRACKED_KEYS = 10000
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._load_seconds: Dict[str, float] = {}
+
+    def _should_refresh_early(self, key: str, ttl_ms: Optional[int]) -> bool:
+        """XFetch: refresh when ttl <= delta * beta * -ln(rand)"""
+        beta = settings.CACHE_EARLY_EXPIRATION_BETA
+        delta = self._load_seconds.get(key)
+        if ttl_ms is None or not delta or beta <= 0:
+            return False
+        return ttl_ms / 1000 <= delta * beta * -math.log(1.0 - random.random())
+
+    def _record_load_time(self, key: str, seconds: float):
+        if len(self._load_seconds) >= self.MAX_TRACKED_KEYS:
+            self._load_seconds.clear()
+        self._load_seconds[key] = seconds
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Loader,
+        expire: Expiry,
+        lease_ms: Optional[int] = None,
+        tags: Optional[Sequence[str]] = None
+    ) -> Any:
+        """
+        Return the cached JSON value for key, running loader() at most once
+        across concurrent callers when it is missing or due for early refresh.
+        The loader must return a JSON-serializable value; exceptions it raises
+        are propagated to every coalesced caller. The stored value is
+        registered under tags so invalidate_tags() can drop it.
+        """
+        cached, ttl_ms = await redis_client.get_json_with_ttl(key)
+        if cached is not None and not self._should_refresh_early(key, ttl_ms):
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            if cached is not None:
+                # Someone is already refreshing early; the current value is still valid
+                return cached
+            metrics.incr("cache.single_flight.coalesced")
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        # Avoid "exception was never retrieved" warnings when nobody else was waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value = await self._load(key, loader, expire, cached, lease_ms or settings.CACHE_LOCK_TIMEOUT_MS, tags)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _load(
+        self,
+        key: str,
+        loader: Loader,
+        expire: Expiry,
+        cached: Any,
+        lease_ms: int,
+        tags: Optional[Sequence[str]]
+    ) -> Any:
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        acquired = await redis_client.acquire_lock(lock_key, token, lease_ms)
+
+        if not acquired:
+            if cached is not None:
+                # Another worker is refreshing early; keep serving the current value
+                return cached
+            metrics.incr("cache.single_flight.lease_waits")
+            value = await self._wait_for_value(key, lease_ms)
+            if value is not None:
+                return value
+            # The lease holder failed or is too slow; load it ourselves
+            logger.warning(f"Timed out waiting for {key} to be recomputed by another worker")
+
+        try:
+            metrics.incr("cache.single_flight.loads")
+            started = time.monotonic()
+            value = await loader()
+            self._record_load_time(key, time.monotonic() - started)
+            try:
+                await redis_client.set_json(key, value, expire=expire(value) if callable(expire) else expire, tags=tags)
+            except RedisError as e:
+                # The value is good; only caching it failed, so the caller must not load it again
+                logger.warning(f"Could not cache {key}: {e}")
+            return value
+        finally:
+            if acquired:
+                try:
+                    await redis_client.release_lock(lock_key, token)
+                except RedisError as e:
+                    logger.warning(f"Could not release the lease on {key}; it expires in {lease_ms} ms: {e}")
+
+    async def _wait_for_value(self, key: str, lease_ms: int) -> Optional[Any]:
+        deadline = time.monotonic() + lease_ms / 1000
+        interval = settings.CACHE_LOCK_POLL_INTERVAL_MS / 1000
+        max_interval = settings.CACHE_LOCK_POLL_MAX_INTERVAL_MS / 1000
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            # Exponential backoff keeps a slow recompute from turning waiters into a Redis poll storm
+            await asyncio.sleep(min(interval, remaining))
+            value = await redis_client.get_json(key)
+            if value is not None:
+                return value
+            interval = min(interval * 2, max_interval)
+
+
+single_flight = SingleFlight()
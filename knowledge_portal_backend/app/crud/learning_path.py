@@ -4,6 +4,7 @@ from sqlalchemy.orm import selectinload
 from sqlalchemy import select
 
 from app.crud.base import CRUDBase
+from app.models.associations import learning_path_video
 from app.models.learning_path import LearningPath
 from app.models.skill import Skill
 from app.models.video import Video
@@ -101,4 +102,58 @@ class CRUDLearningPath(CRUDBase[LearningPath, LearningPathCreate, LearningPathUp
         return result.scalars().all()
 
 
+    async def get_with_skills(self, db: AsyncSession, *, id: int) -> Optional[LearningPath]:
+        """
+        Get a learning path with its skills loaded. Videos are left to the
+        caller so they can be hydrated through the video cache.
+        """
+        stmt = (
+            select(self.model)
+            .where(self.model.id == id)
+            .options(selectinload(self.model.skills))
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_multi_with_skills(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[LearningPath]:
+        """
+        Get multiple learning paths with their skills loaded
+        """
+        stmt = (
+            select(self.model)
+            .offset(skip)
+            .limit(limit)
+            .options(selectinload(self.model.skills))
+        )
+        result = await db.execute(stmt)
+        return result.scalars().all()
+
+    async def get_video_ids(
+        self,
+        db: AsyncSession,
+        *,
+        learning_path_ids: List[int]
+    ) -> Dict[int, List[int]]:
+        """
+        Get the video ids of several learning paths in one query
+        """
+        video_ids: Dict[int, List[int]] = {path_id: [] for path_id in learning_path_ids}
+        if not learning_path_ids:
+            return video_ids
+        stmt = (
+            select(learning_path_video.c.learning_path_id, learning_path_video.c.video_id)
+            .where(learning_path_video.c.learning_path_id.in_(learning_path_ids))
+        )
+        result = await db.execute(stmt)
+        for path_id, video_id in result.all():
+            video_ids[path_id].append(video_id)
+        return video_ids
+
+
 learning_path_crud = CRUDLearningPath(LearningPath) 
\ No newline at end of file
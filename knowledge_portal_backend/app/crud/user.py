@@ -2,14 +2,32 @@ from typing import Any, Dict, Optional, Union, List
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 
+from app.core.redis_client import redis_client
 from app.crud.base import CRUDBase
 from app.models.user import User
 from app.schemas.auth import UserCreate, UserResponse, UserProfileUpdate
 
 class CRUDUser(CRUDBase[User, UserCreate, UserResponse]):
+    # Lookups of unknown ids and emails are remembered briefly as tombstones
+    # (see RedisClient.mark_missing), so ID scans and retries skip Postgres
+    async def get(self, db: AsyncSession, id: Any) -> Optional[User]:
+        cache_key = f"user:{id}"
+        if await redis_client.is_known_missing(cache_key):
+            return None
+        user = await super().get(db, id)
+        if user is None:
+            await redis_client.mark_missing(cache_key)
+        return user
+
     async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        cache_key = f"user:email:{email}"
+        if await redis_client.is_known_missing(cache_key):
+            return None
         result = await db.execute(select(User).where(User.email == email))
-        return result.scalar_one_or_none()
+        user = result.scalar_one_or_none()
+        if user is None:
+            await redis_client.mark_missing(cache_key)
+        return user
 
     async def get_by_username(self, db: AsyncSession, *, username: str) -> Optional[User]:
         result = await db.execute(select(User).where(User.username == username))
@@ -20,6 +38,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserResponse]):
         db.add(db_obj)
         await db.commit()
         await db.refresh(db_obj)
+        await redis_client.clear_missing(f"user:{db_obj.id}", f"user:email:{db_obj.email}")
         return db_obj
 
     async def update(
@@ -34,7 +53,11 @@ class CRUDUser(CRUDBase[User, UserCreate, UserResponse]):
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
 
-        return await super().update(db, db_obj=db_obj, obj_in=update_data)
+        user = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        if "email" in update_data:
+            # The new address may have been looked up (and tombstoned) before it was taken
+            await redis_client.clear_missing(f"user:email:{user.email}")
+        return user
 
     async def update_profile(
         self,
@@ -9,7 +9,13 @@ import re
 from app.core.config import settings
 from app.api.v1.api import api_router
 from app.core.redis_client import redis_client
+from app.core.cache_warmer import cache_warmer
+from app.services.video_sync import video_sync_consumer
+from app.services.video_content_search import video_content_search_service
 from app.core.elasticsearch_client import es_client
+from app.core.metrics import metrics
+from app.core.resilience import OPEN, guards
+from app.core.rate_limit import RateLimitMiddleware
 from app.core.database import init_db
 from app.core.startup import startup_tasks
 
@@ -66,6 +72,10 @@ def is_allowed_origin(origin: str) -> bool:
     
     return False
 
+# Rate limit expensive and abuse-prone routes. Added before CORS so that
+# CORS wraps it and 429 responses still carry CORS headers.
+app.add_middleware(RateLimitMiddleware)
+
 # Set up CORS middleware with custom origin validation
 app.add_middleware(
     CORSMiddleware,
@@ -100,6 +110,18 @@ async def startup_event():
         logger.info("Running startup tasks...")
         await startup_tasks()
         logger.info("Startup tasks completed")
+
+        # Preload popular cache entries in the background; readiness does not wait for it
+        cache_warmer.start()
+
+        # Apply queued video changes to the search index
+        video_sync_consumer.start()
+
+        # Periodically send buffered Elasticsearch writes as bulk requests
+        es_client.write_buffer.start()
+
+        # Pooled client for the video content retriever
+        await video_content_search_service.init()
         
     except Exception as e:
         logger.error(f"Error during startup: {e}")
@@ -122,17 +144,34 @@ async def root():
 @app.get("/health")
 @app.get(f"{settings.API_V1_STR}/health")
 async def health_check():
+    # Circuit breakers of external dependencies; an open one means degraded, not down
+    breakers = {name: guard.snapshot() for name, guard in guards.items()}
     return {
-        "status": "healthy",
+        "status": "degraded" if any(b["state"] == OPEN for b in breakers.values()) else "healthy",
         "services": {
             "api": "up",
             "redis": redis_client.redis_client is not None,
             "elasticsearch": es_client.es_client is not None
-        }
+        },
+        "circuit_breakers": breakers
+    }
+
+@app.get("/metrics")
+@app.get(f"{settings.API_V1_STR}/metrics")
+async def metrics_snapshot():
+    return {
+        "cache": redis_client.cache_stats(),
+        "video_content_search_pool": video_content_search_service.pool_stats(),
+        **metrics.snapshot()
     }
 
 # Shutdown cleanup
 @app.on_event("shutdown")
 async def shutdown_event():
+    await cache_warmer.stop()
+    await video_sync_consumer.stop()
+    # Send any buffered writes before the client goes away
+    await es_client.write_buffer.close()
+    await video_content_search_service.close()
     await redis_client.close()
     await es_client.close()
\ No newline at end of file
@@ -18,6 +18,13 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
 
+    async def get_many(self, ids: List[Any]) -> List[ModelType]:
+        if not ids:
+            return []
+        query = select(self.model).where(self.model.id.in_(ids))
+        result = await self.db.execute(query)
+        return result.scalars().all()
+
     async def get_multi(
         self, 
         *,
@@ -1,5 +1,6 @@
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from app.core.config import settings
 
 class VideoSearchResult(BaseModel):
     id: str
@@ -14,4 +15,17 @@ class VideoSearchResponse(BaseModel):
     results: List[VideoSearchResult]
 
 class VideoContentSearchQuery(BaseModel):
-    query: str 
\ No newline at end of file
+    query: str
+
+class VideoContentSearchBatchQuery(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=settings.VIDEO_CONTENT_SEARCH_BATCH_MAX_QUERIES)
+
+class VideoContentSearchBatchItem(BaseModel):
+    query: str
+    # Exactly one of results and error is set
+    results: Optional[List[VideoSearchResult]] = None
+    error: Optional[str] = None
+
+class VideoContentSearchBatchResponse(BaseModel):
+    # One item per query in the request, in the same order
+    results: List[VideoContentSearchBatchItem]
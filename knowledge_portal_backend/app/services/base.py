@@ -1,6 +1,9 @@
 from typing import Generic, TypeVar, Type, Optional, List, Union, Dict, Any
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import inspect
 from app.repositories.base import BaseRepository
+from app.core.cache_warmer import cache_warmer
 from app.core.redis_client import redis_client
 
 ModelType = TypeVar("ModelType")
@@ -16,11 +19,27 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self.repository = repository
         self.cache_prefix = cache_prefix
 
-    async def get(self, id: Any) -> Optional[ModelType]:
+    def _cache_data(self, db_obj: ModelType) -> Dict[str, Any]:
+        """JSON-safe snapshot of the object's column values"""
+        return jsonable_encoder({
+            attr.key: getattr(db_obj, attr.key)
+            for attr in inspect(db_obj).mapper.column_attrs
+        })
+
+    async def get(self, id: Any, record: bool = True) -> Optional[ModelType]:
+        """
+        Get one object by id, through the cache when there is a cache_prefix.
+        Pass record=False for loads that are not reads, e.g. cache warming,
+        so they do not count towards the id's popularity.
+        """
         if self.cache_prefix:
             # Try to get from cache
+            if record:
+                await cache_warmer.record(self.cache_prefix, id)
             cache_key = f"{self.cache_prefix}:{id}"
             cached_data = await redis_client.get_json(cache_key)
+            if redis_client.is_tombstone(cached_data):
+                return None
             if cached_data:
                 return self.repository.model(**cached_data)
 
@@ -31,12 +50,51 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             # Cache the result
             await redis_client.set_json(
                 f"{self.cache_prefix}:{id}",
-                {k: v for k, v in db_obj.__dict__.items() if not k.startswith('_')},
+                self._cache_data(db_obj),
                 expire=3600  # 1 hour cache
             )
+        elif self.cache_prefix:
+            await redis_client.mark_missing(f"{self.cache_prefix}:{id}")
         
         return db_obj
 
+    async def get_many(self, ids: List[Any]) -> List[ModelType]:
+        """
+        Get several objects by id, in the order given. Cached objects come
+        from a single MGET and the misses from a single IN query. Ids that
+        are cached as missing are skipped without a query.
+        """
+        found: Dict[Any, ModelType] = {}
+        missing = list(ids)
+
+        if self.cache_prefix:
+            await cache_warmer.record_many(self.cache_prefix, ids)
+            cached = await redis_client.get_many_json([f"{self.cache_prefix}:{id}" for id in ids])
+            missing = []
+            for id, cached_data in zip(ids, cached):
+                if redis_client.is_tombstone(cached_data):
+                    continue
+                if cached_data:
+                    found[id] = self.repository.model(**cached_data)
+                else:
+                    missing.append(id)
+
+        if missing:
+            db_objs = await self.repository.get_many(missing)
+            if db_objs and self.cache_prefix:
+                await redis_client.set_many_json(
+                    {f"{self.cache_prefix}:{obj.id}": self._cache_data(obj) for obj in db_objs},
+                    expire=3600  # 1 hour cache
+                )
+            for obj in db_objs:
+                found[obj.id] = obj
+            if self.cache_prefix:
+                for id in missing:
+                    if id not in found:
+                        await redis_client.mark_missing(f"{self.cache_prefix}:{id}")
+
+        return [found[id] for id in ids if id in found]
+
     async def get_multi(
         self,
         *,
@@ -47,7 +105,15 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return await self.repository.get_multi(skip=skip, limit=limit, filters=filters)
 
     async def create(self, *, obj_in: CreateSchemaType) -> ModelType:
-        return await self.repository.create(obj_in=obj_in)
+        db_obj = await self.repository.create(obj_in=obj_in)
+
+        if self.cache_prefix:
+            # Drop derived entries (lists, searches) that depend on this collection,
+            # and any tombstone left by an earlier lookup of this id
+            await redis_client.clear_missing(f"{self.cache_prefix}:{db_obj.id}")
+            await redis_client.invalidate_tags(self.cache_prefix)
+
+        return db_obj
 
     async def update(
         self,
@@ -58,9 +124,10 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         updated_obj = await self.repository.update(db_obj=db_obj, obj_in=obj_in)
         
         if self.cache_prefix:
-            # Invalidate cache
+            # Invalidate cache, including derived entries tagged with this object
             cache_key = f"{self.cache_prefix}:{updated_obj.id}"
             await redis_client.delete_data(cache_key)
+            await redis_client.invalidate_tags(self.cache_prefix, cache_key)
             
         return updated_obj
 
@@ -68,9 +135,10 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj = await self.repository.delete(id=id)
         
         if obj and self.cache_prefix:
-            # Invalidate cache
+            # Invalidate cache, including derived entries tagged with this object
             cache_key = f"{self.cache_prefix}:{id}"
             await redis_client.delete_data(cache_key)
+            await redis_client.invalidate_tags(self.cache_prefix, cache_key)
             
         return obj
 
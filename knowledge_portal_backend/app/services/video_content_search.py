@@ -1,25 +1,62 @@
-from typing import List
+from collections import deque
+from typing import Deque, List, Optional
+import asyncio
 import httpx
 import logging
+import time
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.resilience import (
+    AdaptiveConcurrencyLimiter, CallRejectedError, CircuitBreaker, ResilienceGuard
+)
 from app.schemas.video_content_search import VideoSearchResult, VideoSearchResponse
 
+try:
+    import h2  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    h2 = None
+
 logger = logging.getLogger(__name__)
 
 class VideoContentSearchService:
     def __init__(self):
         self.base_url = settings.VIDEO_SEARCH_API_URL.rstrip('/')  # Remove trailing slash if present
         self.api_key = settings.VIDEO_SEARCH_API_KEY
+        # One pooled client for the app's lifetime, so queries reuse open connections
+        self.client: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+        # Durations of recent successful calls, for the hedging delay
+        self.latencies: Deque[float] = deque(maxlen=settings.VIDEO_SEARCH_API_LATENCY_WINDOW)
+        # Fail fast instead of tying up workers while the retriever is slow or down
+        self.guard = ResilienceGuard(
+            CircuitBreaker(
+                "video_content_search",
+                window=settings.VIDEO_SEARCH_API_BREAKER_WINDOW,
+                min_calls=settings.VIDEO_SEARCH_API_BREAKER_MIN_CALLS,
+                failure_rate=settings.VIDEO_SEARCH_API_BREAKER_FAILURE_RATE,
+                slow_call_seconds=settings.VIDEO_SEARCH_API_SLOW_CALL_SECONDS,
+                slow_call_rate=settings.VIDEO_SEARCH_API_BREAKER_SLOW_CALL_RATE,
+                open_seconds=settings.VIDEO_SEARCH_API_BREAKER_OPEN_SECONDS,
+                half_open_calls=settings.VIDEO_SEARCH_API_BREAKER_HALF_OPEN_CALLS
+            ),
+            AdaptiveConcurrencyLimiter(
+                "video_content_search",
+                initial=settings.VIDEO_SEARCH_API_CONCURRENCY_INITIAL,
+                minimum=settings.VIDEO_SEARCH_API_CONCURRENCY_MIN,
+                maximum=settings.VIDEO_SEARCH_API_CONCURRENCY_MAX,
+                slow_call_seconds=settings.VIDEO_SEARCH_API_SLOW_CALL_SECONDS
+            )
+        )
         logger.info(f"Initialized VideoContentSearchService with base_url: {self.base_url}")
 
-    async def search_content(self, query: str) -> VideoSearchResponse:
-        """
-        Search video content using the video content search API
-        """
+    async def init(self):
+        if self.client is not None:
+            return
+
         headers = {
             "Content-Type": "application/json"
         }
-        
+
         # Only add Authorization header if API key exists
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
@@ -27,50 +64,184 @@ class VideoContentSearchService:
         else:
             logger.warning("No API key provided, proceeding without Authorization header")
 
-        try:
-            # Construct the full URL
-            url = f"{self.base_url}/retriever/query"
-            logger.info(f"Making request to {url} with query: {query}")
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    json={"query": query},
-                    headers=headers,
-                    timeout=30.0  # Add timeout
+        http2 = settings.VIDEO_SEARCH_API_HTTP2
+        if http2 and h2 is None:
+            logger.warning("VIDEO_SEARCH_API_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.VIDEO_SEARCH_API_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.VIDEO_SEARCH_API_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.VIDEO_SEARCH_API_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.VIDEO_SEARCH_API_CONNECT_TIMEOUT_SECONDS,
+                read=settings.VIDEO_SEARCH_API_READ_TIMEOUT_SECONDS,
+                write=settings.VIDEO_SEARCH_API_WRITE_TIMEOUT_SECONDS,
+                pool=settings.VIDEO_SEARCH_API_POOL_TIMEOUT_SECONDS
+            )
+        )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def pool_stats(self) -> dict:
+        """Connection pool usage of the retriever client, for /metrics"""
+        stats = {
+            "open": self.client is not None,
+            "max_connections": settings.VIDEO_SEARCH_API_MAX_CONNECTIONS,
+            "in_flight": self.in_flight
+        }
+        # httpx does not expose its pool; read the httpcore pool behind the default transport
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            idle = sum(1 for connection in connections if connection.is_idle())
+            stats.update(connections=len(connections), idle=idle, active=len(connections) - idle)
+        return stats
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off or there is too little data"""
+        if not settings.VIDEO_SEARCH_API_HEDGING_ENABLED or len(self.latencies) < settings.VIDEO_SEARCH_API_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * settings.VIDEO_SEARCH_API_HEDGE_PERCENTILE))
+        return ordered[index]
+
+    async def _attempt(self, query: str, deadline: float, admitted: Optional[asyncio.Event] = None) -> httpx.Response:
+        async with self.guard.call():
+            if admitted is not None:
+                admitted.set()
+            self.in_flight += 1
+            started = time.monotonic()
+            try:
+                # Overrunning the deadline raises inside the guard, so it counts as a failed, slow call
+                response = await asyncio.wait_for(
+                    self.client.post("/retriever/query", json={"query": query}),
+                    max(0, deadline - asyncio.get_running_loop().time())
                 )
-                
-                logger.info(f"Received response with status code: {response.status_code}")
-                
-                if response.status_code != 200:
-                    error_msg = f"Video search API error: Status {response.status_code}, Response: {response.text}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
-                
-                data = response.json()
-                logger.info(f"Successfully parsed response JSON: {data}")
-                
-                # Transform API response to our schema
-                results = []
-                for item in data["results"]:
-                    try:
-                        result = VideoSearchResult(
-                            id=item["id"],
-                            type=item["type"],
-                            similarity=item["similarity"],
-                            text=item["text"],
-                            start_time=item.get("start_time"),
-                            end_time=item.get("end_time"),
-                            speaker=item.get("speaker")
-                        )
-                        results.append(result)
-                    except Exception as e:
-                        logger.error(f"Error processing result item: {item}, Error: {str(e)}")
-                        continue
-                
-                logger.info(f"Successfully processed {len(results)} results")
-                return VideoSearchResponse(results=results)
-                
+            finally:
+                self.in_flight -= 1
+            metrics.incr("video_content_search.requests")
+            if response.status_code >= 500:
+                # Counted by the breaker; 4xx responses are our fault, not the retriever's
+                raise Exception(f"Video search API error: Status {response.status_code}, Response: {response.text}")
+        self.latencies.append(time.monotonic() - started)
+        return response
+
+    def _record_hedge(self, sent: bool, won: bool):
+        metrics.incr("video_content_search.hedge.eligible")
+        metrics.incr("video_content_search.hedge.sent", int(sent))
+        metrics.incr("video_content_search.hedge.wins", int(won))
+        eligible = metrics.get("video_content_search.hedge.eligible")
+        sent_total = metrics.get("video_content_search.hedge.sent")
+        metrics.set_gauge("video_content_search.hedge.rate", round(sent_total / eligible, 4))
+        if sent_total:
+            metrics.set_gauge(
+                "video_content_search.hedge.win_rate",
+                round(metrics.get("video_content_search.hedge.wins") / sent_total, 4)
+            )
+
+    async def _request(self, query: str) -> httpx.Response:
+        """
+        One query within VIDEO_SEARCH_API_DEADLINE_SECONDS. With hedging on,
+        a second attempt goes out once the first has taken longer than the
+        recent p90; the first good response wins and the other attempt is
+        cancelled. Queries are read-only, so sending one twice is safe.
+        """
+        deadline = asyncio.get_running_loop().time() + settings.VIDEO_SEARCH_API_DEADLINE_SECONDS
+        delay = self.hedge_delay()
+        attempts = [asyncio.create_task(self._attempt(query, deadline))]
+        try:
+            if delay is not None:
+                await asyncio.wait(attempts, timeout=delay)
+            if delay is None or attempts[0].done():
+                if delay is not None:
+                    self._record_hedge(sent=False, won=False)
+                return await attempts[0]
+
+            # Both attempts end by the deadline on their own. The hedge only counts as
+            # sent once it is past the breaker and the concurrency limit
+            hedge_admitted = asyncio.Event()
+            attempts.append(asyncio.create_task(self._attempt(query, deadline, hedge_admitted)))
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        self._record_hedge(sent=hedge_admitted.is_set(), won=attempt is attempts[1])
+                        return attempt.result()
+                    # e.g. the hedge was rejected by the concurrency limit; keep waiting for the other
+            self._record_hedge(sent=hedge_admitted.is_set(), won=False)
+            raise attempts[0].exception()
+        finally:
+            # Cancel the losing attempt, or both if the caller went away
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+
+    async def search_content(self, query: str) -> VideoSearchResponse:
+        """
+        Search video content using the video content search API. Raises
+        CallRejectedError without calling it while the circuit breaker is
+        open or the concurrency limit is reached.
+        """
+        if self.client is None:
+            await self.init()
+
+        try:
+            logger.info(f"Making request to {self.base_url}/retriever/query with query: {query}")
+
+            try:
+                response = await self._request(query)
+            except asyncio.TimeoutError:
+                metrics.incr("video_content_search.deadline_exceeded")
+                raise Exception(f"Request error: no response within {settings.VIDEO_SEARCH_API_DEADLINE_SECONDS}s")
+
+            logger.info(f"Received response with status code: {response.status_code}")
+
+            if response.status_code != 200:
+                error_msg = f"Video search API error: Status {response.status_code}, Response: {response.text}"
+                logger.error(error_msg)
+                raise Exception(error_msg)
+
+            data = response.json()
+            logger.info(f"Successfully parsed response JSON: {data}")
+
+            # Transform API response to our schema
+            results = []
+            for item in data["results"]:
+                try:
+                    result = VideoSearchResult(
+                        id=item["id"],
+                        type=item["type"],
+                        similarity=item["similarity"],
+                        text=item["text"],
+                        start_time=item.get("start_time"),
+                        end_time=item.get("end_time"),
+                        speaker=item.get("speaker")
+                    )
+                    results.append(result)
+                except Exception as e:
+                    logger.error(f"Error processing result item: {item}, Error: {str(e)}")
+                    continue
+
+            logger.info(f"Successfully processed {len(results)} results")
+            return VideoSearchResponse(results=results)
+
+        except CallRejectedError:
+            raise
+        except httpx.PoolTimeout as e:
+            metrics.incr("video_content_search.pool_timeouts")
+            error_msg = f"Request error: no free connection to the retriever: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
         except httpx.RequestError as e:
             error_msg = f"Request error: {str(e)}"
             logger.error(error_msg)
@@ -80,4 +251,4 @@ class VideoContentSearchService:
             logger.error(error_msg)
             raise Exception(error_msg)
 
-video_content_search_service = VideoContentSearchService() 
\ No newline at end of file
+video_content_search_service = VideoContentSearchService()
@@ -0,0 +1,447 @@
+"""
+Building the Elasticsearch "videos" index from Postgres.
+
+Searches read "videos", which is an alias. rebuild() fills a new
+"videos_v{N}" index while the alias keeps pointing at the previous one,
+then moves the alias in a single atomic update_aliases call and deletes
+versions older than the ones kept for rollback, so readers only ever see a
+complete index.
+
+Videos are streamed with a server-side cursor (tags and skills are loaded
+per batch with selectinload rather than per row) and sent through the bulk
+API, with up to ELASTICSEARCH_BULK_MAX_IN_FLIGHT chunks outstanding at a
+time. Refresh is disabled while the index is loading and restored, with one
+explicit refresh, when it is done.
+
+Documents are written with external versions taken from the rows (see
+document_version), by rebuilds and by the incremental sync alike, so a
+rebuild's older snapshot of a video cannot overwrite a newer sync update
+that reached the new index first.
+"""
+from datetime import timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+import uuid
+
+from elasticsearch.exceptions import NotFoundError
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.elasticsearch_client import es_client
+from app.core.metrics import metrics
+from app.core.redis_client import redis_client
+from app.models.video import Video
+
+logger = logging.getLogger(__name__)
+
+VIDEO_INDEX = "videos"
+
+VIDEO_INDEX_MAPPINGS = {
+    "properties": {
+        "id": {"type": "keyword"},
+        "title": {
+            "type": "text",
+            "analyzer": "standard",
+            "fields": {
+                "keyword": {"type": "keyword"}
+            }
+        },
+        "description": {"type": "text", "analyzer": "standard"},
+        "url": {"type": "keyword"},
+        "duration": {"type": "float"},
+        "thumbnail_url": {"type": "keyword"},
+        "category": {"type": "keyword"},
+        "difficulty_level": {"type": "keyword"},
+        # The transcript is indexed as timed segments, so matches can point into the video
+        "segments": {
+            "type": "nested",
+            "properties": {
+                "text": {"type": "text", "analyzer": "standard"},
+                "start": {"type": "float"},  # seconds
+                "end": {"type": "float"}
+            }
+        },
+        "tags": {"type": "keyword"},
+        "skills": {"type": "keyword"},
+        "created_at": {"type": "date"},
+        "updated_at": {"type": "date"},
+        # Prefix suggestions over titles, tags and skills for /video-search/suggest
+        "suggest": {"type": "completion", "analyzer": "simple"}
+    }
+}
+
+VIDEO_INDEX_SETTINGS = {
+    "number_of_shards": 1,
+    "number_of_replicas": 0,
+    "analysis": {
+        "analyzer": {
+            "standard": {
+                "type": "standard",
+                "stopwords": "_english_"
+            }
+        }
+    }
+}
+
+# Samples of per-document bulk errors kept in the report
+MAX_REPORTED_ERRORS = 10
+
+# Held while a rebuild runs so concurrent requests and scripts do not start another one
+REBUILD_LOCK_KEY = "lock:reindex:videos"
+REBUILD_LOCK_MS = 60 * 60 * 1000
+# Where the outcome of the last rebuild is kept for the status endpoint
+LAST_REBUILD_KEY = "reindex:videos:last"
+# Name of the version being filled, so incremental updates are written to it too
+BUILDING_INDEX_KEY = "reindex:videos:building"
+
+
+class RebuildInProgressError(Exception):
+    pass
+
+
+class ReindexReport(BaseModel):
+    index: str
+    indexed: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+    docs_per_second: float = 0.0
+    errors: List[str] = []
+    alias_swapped: bool = False
+    deleted_indices: List[str] = []
+
+
+def video_document(video: Video) -> Dict[str, Any]:
+    """The search document for a video; tags and skills must already be loaded"""
+    return {
+        "id": video.id,
+        "title": video.title,
+        "description": video.description,
+        "url": str(video.url),
+        "duration": video.duration,
+        "thumbnail_url": str(video.thumbnail_url) if video.thumbnail_url else None,
+        "category": video.category,
+        "difficulty_level": video.difficulty_level,
+        "segments": transcript_segments(video),
+        "tags": [tag.name for tag in video.tags],
+        "skills": [skill.name for skill in video.skills],
+        "created_at": video.created_at.isoformat() if video.created_at else None,
+        "updated_at": video.updated_at.isoformat() if video.updated_at else None,
+        "suggest": video_suggestions(video)
+    }
+
+
+def document_version(video: Video) -> int:
+    """
+    External version of a video's document: when the row or one of its
+    skills last changed, in epoch milliseconds. Tags carry no timestamp, so
+    writes use version_type "external_gte" and an equal version still wins.
+    """
+    times = [video.updated_at or video.created_at]
+    times.extend(skill.updated_at for skill in video.skills)
+    latest = max((moment for moment in times if moment), default=None)
+    if latest is None:
+        return 0
+    # Timestamps are stored as naive UTC
+    return int(latest.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def transcript_segments(video: Video) -> List[Dict[str, Any]]:
+    """
+    Split the transcript into VIDEO_SEGMENT_WORDS-word segments. Transcripts
+    carry no timing, so start and end are estimated from each segment's word
+    offset and the video's duration (which is stored in minutes).
+    """
+    words = (video.transcript or "").split()
+    if not words:
+        return []
+    seconds_per_word = (video.duration or 0) * 60 / len(words)
+    size = settings.VIDEO_SEGMENT_WORDS
+    return [
+        {
+            "text": " ".join(words[offset:offset + size]),
+            "start": round(offset * seconds_per_word, 1),
+            "end": round(min(offset + size, len(words)) * seconds_per_word, 1)
+        }
+        for offset in range(0, len(words), size)
+    ]
+
+
+def video_suggestions(video: Video) -> List[Dict[str, Any]]:
+    """Completion inputs; titles rank above tag and skill names"""
+    suggestions = []
+    if video.title:
+        suggestions.append({"input": [video.title], "weight": 3})
+    keywords = [tag.name for tag in video.tags] + [skill.name for skill in video.skills]
+    if keywords:
+        suggestions.append({"input": keywords, "weight": 1})
+    return suggestions
+
+
+def _version(index_name: str) -> Optional[int]:
+    prefix = f"{VIDEO_INDEX}_v"
+    if index_name.startswith(prefix) and index_name[len(prefix):].isdigit():
+        return int(index_name[len(prefix):])
+    return None
+
+
+class VideoIndexService:
+    def __init__(self):
+        # Keep references to background rebuilds so they are not garbage collected mid-flight
+        self._rebuild_tasks: Set[asyncio.Task] = set()
+
+    async def _versioned_indices(self) -> List[str]:
+        """Existing videos_v{N} indices, oldest first"""
+        indices = await es_client.es_client.indices.get(index=f"{VIDEO_INDEX}_v*")
+        return sorted((name for name in indices if _version(name) is not None), key=_version)
+
+    async def _alias_targets(self) -> List[str]:
+        try:
+            return list(await es_client.es_client.indices.get_alias(name=VIDEO_INDEX))
+        except NotFoundError:
+            return []
+
+    async def create_version(self) -> str:
+        """Create the next, empty videos_v{N} index and return its name"""
+        if not es_client.es_client:
+            await es_client.init()
+
+        existing = await self._versioned_indices()
+        index_name = f"{VIDEO_INDEX}_v{_version(existing[-1]) + 1 if existing else 1}"
+        await es_client.es_client.indices.create(
+            index=index_name,
+            mappings=VIDEO_INDEX_MAPPINGS,
+            settings=VIDEO_INDEX_SETTINGS
+        )
+        return index_name
+
+    async def swap_alias(self, index_name: str):
+        """Point the videos alias at index_name in one atomic step"""
+        actions: List[Dict[str, Any]] = [{"add": {"index": index_name, "alias": VIDEO_INDEX}}]
+        targets = await self._alias_targets()
+        actions.extend(
+            {"remove": {"index": target, "alias": VIDEO_INDEX}}
+            for target in targets if target != index_name
+        )
+        if not targets and await es_client.es_client.indices.exists(index=VIDEO_INDEX):
+            # A concrete index named "videos" from before versioning; the alias replaces it
+            actions.append({"remove_index": {"index": VIDEO_INDEX}})
+        await es_client.es_client.indices.update_aliases(actions=actions)
+
+    async def delete_old_versions(self, keep: Optional[int] = None) -> List[str]:
+        """Delete all but the newest `keep` versions; the alias target is never deleted"""
+        keep = settings.ELASTICSEARCH_INDEX_VERSIONS_TO_KEEP if keep is None else keep
+        targets = set(await self._alias_targets())
+        versions = await self._versioned_indices()
+        stale = [name for name in versions[:max(len(versions) - keep, 0)] if name not in targets]
+        if stale:
+            await es_client.es_client.indices.delete(index=",".join(stale))
+        return stale
+
+    async def ensure_index(self) -> bool:
+        """Create an empty first version behind the alias if there is no videos index at all"""
+        if not es_client.es_client:
+            await es_client.init()
+        if await es_client.es_client.indices.exists(index=VIDEO_INDEX):
+            return False
+        await self.swap_alias(await self.create_version())
+        return True
+
+    async def rebuild(self, db: AsyncSession) -> ReindexReport:
+        """
+        Build a new index version from the database and switch searches to
+        it. The alias is left alone if the load had more than
+        ELASTICSEARCH_REINDEX_MAX_FAILURES failed documents; the partial
+        index is deleted in that case. Raises RebuildInProgressError if a
+        rebuild is already running anywhere.
+        """
+        if not redis_client.redis_client:
+            await redis_client.init()
+        token = uuid.uuid4().hex
+        if not await redis_client.acquire_lock(REBUILD_LOCK_KEY, token, REBUILD_LOCK_MS):
+            raise RebuildInProgressError("A video index rebuild is already running")
+        try:
+            return await self._rebuild(db)
+        finally:
+            await redis_client.release_lock(REBUILD_LOCK_KEY, token)
+
+    async def _rebuild(self, db: AsyncSession) -> ReindexReport:
+        """rebuild() for a caller that already holds the rebuild lock"""
+        index_name = await self.create_version()
+        await self._set_building_index(index_name)
+        try:
+            try:
+                report = await self.reindex(db, index_name=index_name)
+            except Exception:
+                await es_client.es_client.indices.delete(index=index_name)
+                raise
+
+            if report.failed > settings.ELASTICSEARCH_REINDEX_MAX_FAILURES:
+                logger.error(f"Not switching to {index_name}: {report.failed} documents failed to index")
+                await es_client.es_client.indices.delete(index=index_name)
+                return report
+
+            await self.swap_alias(index_name)
+        finally:
+            # Only cleared after the swap, so incremental updates reach the new index either way
+            await self._set_building_index(None)
+
+        report.alias_swapped = True
+        report.deleted_indices = await self.delete_old_versions()
+        logger.info(f"Alias {VIDEO_INDEX} now points at {index_name}")
+        return report
+
+    async def _set_building_index(self, index_name: Optional[str]):
+        if index_name:
+            await redis_client.set_data(BUILDING_INDEX_KEY, index_name, expire=REBUILD_LOCK_MS // 1000)
+        else:
+            await redis_client.delete_data(BUILDING_INDEX_KEY)
+
+    async def building_index(self) -> Optional[str]:
+        """The version a rebuild is currently filling, if any"""
+        return await redis_client.get_data(BUILDING_INDEX_KEY)
+
+    async def start_rebuild(self) -> bool:
+        """
+        Run rebuild() in the background with its own database session.
+        Returns False, without starting anything, if a rebuild is already
+        running on any worker.
+        """
+        token = uuid.uuid4().hex
+        if not await redis_client.acquire_lock(REBUILD_LOCK_KEY, token, REBUILD_LOCK_MS):
+            return False
+        task = asyncio.create_task(self._run_rebuild(token))
+        self._rebuild_tasks.add(task)
+        task.add_done_callback(self._rebuild_tasks.discard)
+        return True
+
+    async def _run_rebuild(self, token: str):
+        try:
+            async with AsyncSessionLocal() as db:
+                report = await self._rebuild(db)
+            await redis_client.set_json(LAST_REBUILD_KEY, report.model_dump())
+            if report.alias_swapped:
+                # Cached search results were computed against the old index
+                await redis_client.invalidate_tags("video")
+        except Exception as e:
+            logger.error(f"Rebuilding the video index failed: {e}")
+        finally:
+            await redis_client.release_lock(REBUILD_LOCK_KEY, token)
+
+    async def rebuild_running(self) -> bool:
+        return bool(await redis_client.redis_client.exists(REBUILD_LOCK_KEY))
+
+    async def last_report(self) -> Optional[ReindexReport]:
+        data = await redis_client.get_json(LAST_REBUILD_KEY)
+        return ReindexReport(**data) if data else None
+
+    async def reindex(
+        self,
+        db: AsyncSession,
+        index_name: str = VIDEO_INDEX,
+        chunk_size: Optional[int] = None,
+        max_in_flight: Optional[int] = None
+    ) -> ReindexReport:
+        """Stream every video into index_name and return throughput and failure counts"""
+        if not es_client.es_client:
+            await es_client.init()
+
+        chunk_size = chunk_size or settings.ELASTICSEARCH_BULK_CHUNK_SIZE
+        in_flight = asyncio.Semaphore(max_in_flight or settings.ELASTICSEARCH_BULK_MAX_IN_FLIGHT)
+        report = ReindexReport(index=index_name)
+        pending: Set[asyncio.Task] = set()
+
+        async def send(documents: List[Dict[str, Any]]):
+            try:
+                await self._send_chunk(index_name, documents, report)
+            finally:
+                in_flight.release()
+
+        await es_client.es_client.indices.put_settings(
+            index=index_name, settings={"index": {"refresh_interval": "-1"}}
+        )
+        started = time.monotonic()
+        try:
+            stmt = (
+                select(Video)
+                .options(selectinload(Video.tags), selectinload(Video.skills))
+                .order_by(Video.id)
+                .execution_options(yield_per=chunk_size)
+            )
+            result = await db.stream(stmt)
+            async for videos in result.scalars().partitions():
+                documents = [(video_document(video), document_version(video)) for video in videos]
+                # Keep the session from holding on to every row of the catalog
+                for video in videos:
+                    db.expunge(video)
+
+                await in_flight.acquire()
+                task = asyncio.create_task(send(documents))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            await es_client.es_client.indices.put_settings(
+                index=index_name, settings={"index": {"refresh_interval": None}}
+            )
+            await es_client.es_client.indices.refresh(index=index_name)
+
+        report.seconds = round(time.monotonic() - started, 3)
+        report.docs_per_second = round(report.indexed / report.seconds, 1) if report.seconds else 0.0
+        metrics.incr("elasticsearch.reindex.indexed", report.indexed)
+        metrics.incr("elasticsearch.reindex.failed", report.failed)
+        metrics.set_gauge("elasticsearch.reindex.docs_per_second", report.docs_per_second)
+        logger.info(
+            f"Reindexed {report.indexed} videos into {index_name} in {report.seconds}s "
+            f"({report.docs_per_second} docs/s, {report.failed} failed)"
+        )
+        return report
+
+    async def _send_chunk(
+        self, index_name: str, documents: List[Tuple[Dict[str, Any], int]], report: ReindexReport
+    ):
+        operations: List[Dict[str, Any]] = []
+        for document, version in documents:
+            operations.append({"index": {
+                "_index": index_name,
+                "_id": str(document["id"]),
+                "version": version,
+                "version_type": "external_gte"
+            }})
+            operations.append(document)
+
+        try:
+            response = await es_client.es_client.bulk(operations=operations, refresh=False)
+        except Exception as e:
+            logger.error(f"Bulk request of {len(documents)} videos failed: {e}")
+            report.failed += len(documents)
+            self._add_error(report, str(e))
+            return
+
+        if not response.get("errors"):
+            report.indexed += len(documents)
+            return
+        for item in response["items"]:
+            result = item["index"]
+            if result.get("status") == 409:
+                # The incremental sync already wrote a newer version of this video
+                report.indexed += 1
+            elif "error" in result:
+                report.failed += 1
+                self._add_error(report, f"{result.get('_id')}: {result['error']}")
+            else:
+                report.indexed += 1
+
+    @staticmethod
+    def _add_error(report: ReindexReport, error: str):
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(error)
+
+
+video_index_service = VideoIndexService()
@@ -0,0 +1,217 @@
+"""
+Incremental Postgres -> Elasticsearch sync for the videos index.
+
+SQLAlchemy session events note which videos a transaction touched (directly,
+through their tags/skills collections, or by renaming a tag or skill) and,
+once it commits, add them to a Redis set. The set coalesces repeated
+changes to the same video. VideoSyncConsumer drains it every
+ELASTICSEARCH_SYNC_INTERVAL_MS and applies one bulk request: the full
+document for every video that still exists and a delete for the rest, both
+externally versioned (see document_version) so they order correctly
+against a concurrent rebuild.
+
+Only ORM unit-of-work changes are captured; Core statements such as
+session.execute(insert(video_tags)) bypass the session events and still
+need a rebuild (see app/services/video_index.py).
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, selectinload
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.elasticsearch_client import es_client
+from app.core.metrics import metrics
+from app.core.redis_client import redis_client
+from app.models.associations import video_skills, video_tags
+from app.models.skill import Skill
+from app.models.tag import Tag
+from app.models.video import Video
+from app.services.video_index import VIDEO_INDEX, document_version, video_document, video_index_service
+
+logger = logging.getLogger(__name__)
+
+# Members are "video:{id}", "tag:{id}" or "skill:{id}"
+PENDING_KEY = "sync:videos:pending"
+SESSION_INFO_KEY = "video_sync_changes"
+
+# Keep references to the tasks that publish committed changes
+_publish_tasks: Set[asyncio.Task] = set()
+
+
+def _collect_changes(session: Session) -> Set[str]:
+    changes: Set[str] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, Video):
+            changes.add(f"video:{obj.id}")
+        elif isinstance(obj, (Tag, Skill)):
+            kind = "tag" if isinstance(obj, Tag) else "skill"
+            # Expanded to the videos that carry it when the change is applied
+            changes.add(f"{kind}:{obj.id}")
+            history = inspect(obj).attrs.videos.history
+            changes.update(f"video:{video.id}" for video in (*history.added, *history.deleted))
+    return changes
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_changes(session: Session, flush_context):
+    changes = _collect_changes(session)
+    if changes:
+        session.info.setdefault(SESSION_INFO_KEY, set()).update(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_changes(session: Session):
+    changes = session.info.pop(SESSION_INFO_KEY, None)
+    if not changes or not settings.ELASTICSEARCH_SYNC_ENABLED or not redis_client.redis_client:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_publish(changes))
+    _publish_tasks.add(task)
+    task.add_done_callback(_publish_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session):
+    session.info.pop(SESSION_INFO_KEY, None)
+
+
+async def _publish(changes: Iterable[str]):
+    try:
+        await redis_client.redis_client.sadd(PENDING_KEY, *changes)
+    except RedisError as e:
+        logger.warning(f"Could not queue video index updates {sorted(changes)}: {e}")
+
+
+class VideoSyncConsumer:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def _video_ids(self, db, members: List[str]) -> Set[int]:
+        video_ids: Set[int] = set()
+        tag_ids: List[int] = []
+        skill_ids: List[int] = []
+        for member in members:
+            kind, _, id = member.partition(":")
+            if kind == "video":
+                video_ids.add(int(id))
+            elif kind == "tag":
+                tag_ids.append(int(id))
+            elif kind == "skill":
+                skill_ids.append(int(id))
+        if tag_ids:
+            result = await db.execute(select(video_tags.c.video_id).where(video_tags.c.tag_id.in_(tag_ids)))
+            video_ids.update(result.scalars())
+        if skill_ids:
+            result = await db.execute(select(video_skills.c.video_id).where(video_skills.c.skill_id.in_(skill_ids)))
+            video_ids.update(result.scalars())
+        return video_ids
+
+    async def apply_pending(self) -> int:
+        """Apply one batch of queued changes; returns the number of videos synced"""
+        members = await redis_client.redis_client.spop(PENDING_KEY, settings.ELASTICSEARCH_SYNC_BATCH_SIZE)
+        if not members:
+            return 0
+        members = [member.decode() for member in members]
+
+        try:
+            if not await es_client.es_client.indices.exists_alias(name=VIDEO_INDEX):
+                # An upsert would auto-create a concrete "videos" index with dynamic
+                # mappings; keep the changes queued until a rebuild creates the alias
+                await redis_client.redis_client.sadd(PENDING_KEY, *members)
+                logger.debug(f"Alias {VIDEO_INDEX} does not exist yet; deferring {len(members)} video index updates")
+                return 0
+
+            async with AsyncSessionLocal() as db:
+                video_ids = await self._video_ids(db, members)
+                result = await db.execute(
+                    select(Video)
+                    .options(selectinload(Video.tags), selectinload(Video.skills))
+                    .where(Video.id.in_(video_ids))
+                )
+                documents = {
+                    video.id: (video_document(video), document_version(video)) for video in result.scalars()
+                }
+
+            # A rebuild in progress gets the same updates, so the swap does not lose them
+            index_names = [VIDEO_INDEX]
+            building = await video_index_service.building_index()
+            if building:
+                index_names.append(building)
+            for index_name in index_names:
+                await self._send(index_name, video_ids, documents)
+        except Exception:
+            # Put the batch back so the changes are retried on the next tick
+            await redis_client.redis_client.sadd(PENDING_KEY, *members)
+            raise
+
+        metrics.incr("elasticsearch.sync.updated", len(documents))
+        metrics.incr("elasticsearch.sync.deleted", len(video_ids) - len(documents))
+        # Cached search results may include the changed videos
+        await redis_client.invalidate_tags("video")
+        return len(video_ids)
+
+    async def _send(
+        self, index_name: str, video_ids: Set[int], documents: Dict[int, Tuple[Dict[str, Any], int]]
+    ):
+        # The row is gone, so its deletion is versioned with the time it was noticed
+        deleted_version = int(time.time() * 1000)
+        operations: List[Dict[str, Any]] = []
+        for video_id in video_ids:
+            if video_id in documents:
+                document, version = documents[video_id]
+                operations.append({"index": {
+                    "_index": index_name, "_id": str(video_id), "version": version, "version_type": "external_gte"
+                }})
+                operations.append(document)
+            else:
+                operations.append({"delete": {
+                    "_index": index_name, "_id": str(video_id), "version": deleted_version, "version_type": "external"
+                }})
+        if not operations:
+            return
+
+        response = await es_client.es_client.bulk(operations=operations, refresh=False)
+        if response.get("errors"):
+            for item in response["items"]:
+                (action, outcome), = item.items()
+                # Deleting a video that was never indexed is fine, and a version
+                # conflict means the index already has a newer copy
+                if "error" in outcome and outcome.get("status") not in (404, 409):
+                    metrics.incr("elasticsearch.sync.failures")
+                    logger.error(f"Failed to sync video {outcome.get('_id')} to {index_name}: {outcome['error']}")
+
+    async def _run(self):
+        interval = settings.ELASTICSEARCH_SYNC_INTERVAL_MS / 1000
+        while True:
+            try:
+                await self.apply_pending()
+            except Exception as e:
+                logger.warning(f"Video index sync failed, retrying: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self):
+        if settings.ELASTICSEARCH_SYNC_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+video_sync_consumer = VideoSyncConsumer()
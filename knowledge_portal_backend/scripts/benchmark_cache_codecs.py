@@ -0,0 +1,121 @@
+"""
+Compare cache value encodings against the original plain json.dumps format.
+
+Reports encode/decode time and encoded size for representative quiz and
+search payloads. With --redis it also stores each encoding and reads back
+Redis' MEMORY USAGE for the key.
+
+    python scripts/benchmark_cache_codecs.py [--redis redis://localhost:6379/0]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import timeit
+from pathlib import Path
+
+# Add the parent directory to Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.cache_codec import CacheCodec, lz4_frame, msgpack, orjson
+
+ITERATIONS = 2000
+
+
+def quiz_payload(num_questions: int = 20) -> dict:
+    return {
+        "value": {
+            "id": "42",
+            "title": "Quiz for Video 42",
+            "description": "Test your knowledge of Video 42",
+            "video_id": "42",
+            "difficulty_level": "medium",
+            "questions": [
+                {
+                    "id": f"q_{i}",
+                    "question": f"Which statement about decorators in example {i} is correct?",
+                    "options": [f"Option {j} for question {i} with a longer explanation text" for j in range(4)],
+                    "correct_answer": i % 4,
+                    "explanation": "Decorators wrap a callable and return a new callable. " * 6
+                }
+                for i in range(num_questions)
+            ],
+            "passing_score": 70,
+            "time_limit": 30
+        },
+        "stored_at": 1700000000.0
+    }
+
+
+def search_payload(num_results: int = 10) -> dict:
+    return {
+        "value": [
+            {
+                "id": str(i),
+                "title": f"Python decorators in depth, part {i}",
+                "description": "A walkthrough of how decorators work, with closures and functools.wraps. " * 4,
+                "url": f"https://videos.example.com/watch/{i}",
+                "duration": 12.5 + i,
+                "category": "programming",
+                "difficulty_level": "intermediate",
+                "tags": ["python", "decorators", "functions"],
+                "skills": ["python", "metaprogramming"]
+            }
+            for i in range(num_results)
+        ],
+        "stored_at": 1700000000.0
+    }
+
+
+class LegacyCodec:
+    """The format used before CacheCodec: json.dumps text"""
+    def encode(self, value):
+        return json.dumps(value).encode()
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+def codecs():
+    candidates = [("legacy json.dumps", LegacyCodec())]
+    serializers = ["json"] + (["msgpack"] if msgpack is not None else [])
+    compressions = ["none", "zlib"] + (["lz4"] if lz4_frame is not None else [])
+    for serializer in serializers:
+        for compression in compressions:
+            name = f"{'orjson' if serializer == 'json' and orjson is not None else serializer}+{compression}"
+            candidates.append((name, CacheCodec(serializer, compression, compression_min_bytes=1024)))
+    return candidates
+
+
+async def redis_memory_usage(url: str, key: str, data: bytes) -> int:
+    import redis.asyncio as redis
+    client = redis.from_url(url)
+    try:
+        await client.set(key, data, ex=60)
+        return await client.memory_usage(key, samples=0)
+    finally:
+        await client.delete(key)
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis", help="Redis URL to measure MEMORY USAGE against")
+    args = parser.parse_args()
+
+    for payload_name, payload in (("quiz", quiz_payload()), ("search", search_payload())):
+        print(f"\n{payload_name} payload")
+        print(f"{'codec':<22}{'bytes':>8}{'encode us':>12}{'decode us':>12}{'redis bytes':>14}")
+        for name, codec in codecs():
+            data = codec.encode(payload)
+            assert codec.decode(data) == payload
+            encode_us = timeit.timeit(lambda: codec.encode(payload), number=ITERATIONS) / ITERATIONS * 1e6
+            decode_us = timeit.timeit(lambda: codec.decode(data), number=ITERATIONS) / ITERATIONS * 1e6
+            memory = "-"
+            if args.redis:
+                memory = asyncio.run(redis_memory_usage(args.redis, f"benchmark:codec:{name}", data))
+            print(f"{name:<22}{len(data):>8}{encode_us:>12.1f}{decode_us:>12.1f}{memory:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare video search response sizes with and without response trimming.
+
+Sends each endpoint's query to Elasticsearch twice: as before (full _source
+and every response field) and with the _source projection and filter_path
+the endpoint now uses. Reports response bytes, JSON decode time and round
+trip time per query.
+
+    python scripts/benchmark_search_payload.py [--url http://localhost:9200] [--query python ...]
+"""
+import argparse
+import json
+import sys
+import time
+import timeit
+from pathlib import Path
+
+import httpx
+
+# Add the parent directory to Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.api.v1.endpoints.video_search import (
+    FACETS_FILTER_PATH, RESULT_FILTER_PATH, RESULT_SOURCE_FIELDS, SUGGEST_FILTER_PATH,
+    TIER_ALL, TIER_FUZZY, VideoSearchQuery, build_bool_query, build_facet_aggregations, build_search_query
+)
+from app.core.config import get_settings
+
+settings = get_settings()
+
+ITERATIONS = 200
+DEFAULT_QUERIES = ["python", "machine learning", "react hooks", ""]
+
+
+def search_bodies(query: str):
+    """(name, body, trimmed params) for each search the video endpoints send"""
+    search_query = VideoSearchQuery(query=query, per_page=20)
+    # The fuzzy tier is the largest response: it adds transcript segment hits
+    tier = TIER_FUZZY if query else TIER_ALL
+    page = build_search_query(search_query, tier)
+    page["aggs"] = build_facet_aggregations()
+    facets = {"size": 0, "query": build_bool_query(search_query, tier), "aggs": build_facet_aggregations()}
+    suggest = {
+        "size": 0,
+        "suggest": {"videos": {"prefix": query[:3] or "a", "completion": {"field": "suggest", "size": 8}}}
+    }
+    return [
+        ("page", page, {
+            "_source_includes": ",".join(RESULT_SOURCE_FIELDS),
+            "filter_path": ",".join(RESULT_FILTER_PATH)
+        }),
+        ("facets", facets, {"filter_path": ",".join(FACETS_FILTER_PATH)}),
+        ("suggest", suggest, {"filter_path": ",".join(SUGGEST_FILTER_PATH)}),
+    ]
+
+
+def measure(client: httpx.Client, url: str, body: dict, params: dict):
+    started = time.perf_counter()
+    response = client.post(url, json=body, params=params)
+    round_trip_ms = (time.perf_counter() - started) * 1000
+    response.raise_for_status()
+    data = response.content
+    decode_us = timeit.timeit(lambda: json.loads(data), number=ITERATIONS) / ITERATIONS * 1e6
+    return len(data), decode_us, round_trip_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"http://{settings.ELASTICSEARCH_HOST}:{settings.ELASTICSEARCH_PORT}")
+    parser.add_argument("--index", default="videos")
+    parser.add_argument("--query", action="append", help="Search text (repeatable)")
+    args = parser.parse_args()
+
+    url = f"{args.url.rstrip('/')}/{args.index}/_search"
+    with httpx.Client(timeout=30) as client:
+        print(f"{'query':<20}{'search':<9}{'bytes':>10}{'trimmed':>10}{'decode us':>11}{'trimmed':>10}{'rtt ms':>9}{'trimmed':>9}")
+        for query in args.query or DEFAULT_QUERIES:
+            for name, body, trimmed_params in search_bodies(query):
+                full = measure(client, url, body, {})
+                # The suggest endpoint also stops completion options from carrying their document
+                trimmed_body = {**body, "_source": False} if name == "suggest" else body
+                trimmed = measure(client, url, trimmed_body, trimmed_params)
+                print(
+                    f"{query or '(empty)':<20}{name:<9}{full[0]:>10}{trimmed[0]:>10}"
+                    f"{full[1]:>11.1f}{trimmed[1]:>10.1f}{full[2]:>9.1f}{trimmed[2]:>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+
+# Settings are read when app.core.config is first imported; these are required
+os.environ.setdefault("GOOGLE_CLIENT_ID", "test-client-id")
+os.environ.setdefault("GOOGLE_CLIENT_SECRET", "test-client-secret")
+
+import fakeredis
+import pytest
+
+from app.core import redis_client as redis_client_module
+from app.core.redis_client import redis_client
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Point the shared redis_client at an in-memory Redis, with its Lua scripts registered"""
+    server = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(redis_client, "redis_client", server)
+    monkeypatch.setattr(redis_client, "local_cache", None)
+    for name in ("release_lock", "invalidate_tags", "add_tags", "sliding_window", "update_session"):
+        script = getattr(redis_client_module, f"{name.upper()}_SCRIPT")
+        monkeypatch.setattr(redis_client, f"_{name}_script", server.register_script(script), raising=False)
+    return server
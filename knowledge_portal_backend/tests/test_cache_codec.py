@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from app.core import cache_codec
+from app.core.cache_codec import LEGACY_JSON_MIN_BYTE, CacheCodec
+
+VALUE = {"id": 7, "title": "Python decorators", "tags": ["python", "functions"], "score": 0.5, "missing": None}
+
+
+@pytest.mark.parametrize("serializer", ["json", "orjson", "msgpack"])
+@pytest.mark.parametrize("compression", ["none", "zlib", "lz4"])
+def test_round_trip(serializer, compression):
+    codec = CacheCodec(serializer, compression, compression_min_bytes=0)
+    encoded = codec.encode(VALUE)
+    assert encoded[0] < LEGACY_JSON_MIN_BYTE
+    assert codec.decode(encoded) == VALUE
+
+
+def test_small_values_are_not_compressed():
+    codec = CacheCodec("json", "zlib", compression_min_bytes=1024)
+    encoded = codec.encode(VALUE)
+    assert encoded[0] >> 3 == cache_codec.COMPRESSION_NONE
+    assert codec.decode(encoded) == VALUE
+
+
+def test_large_values_are_compressed():
+    codec = CacheCodec("json", "zlib", compression_min_bytes=64)
+    value = {"transcript": "word " * 1000}
+    encoded = codec.encode(value)
+    assert encoded[0] >> 3 == cache_codec.COMPRESSION_ZLIB
+    assert len(encoded) < len(json.dumps(value))
+    assert codec.decode(encoded) == value
+
+
+@pytest.mark.parametrize("legacy", [VALUE, [1, 2, 3], "text", 42])
+def test_decodes_legacy_plain_json(legacy):
+    # Written by json.dumps before values carried a header
+    assert CacheCodec("msgpack", "lz4").decode(json.dumps(legacy).encode()) == legacy
+
+
+def test_any_codec_decodes_any_header():
+    encoded = CacheCodec("json", "zlib", compression_min_bytes=0).encode(VALUE)
+    assert CacheCodec("msgpack", "none").decode(encoded) == VALUE
+
+
+def test_unknown_settings_are_rejected():
+    with pytest.raises(ValueError):
+        CacheCodec("pickle")
+    with pytest.raises(ValueError):
+        CacheCodec("json", "brotli")
@@ -0,0 +1,45 @@
+import pytest
+
+from app.core.redis_client import redis_client
+
+
+@pytest.mark.asyncio
+async def test_new_tag_set_takes_the_key_ttl(fake_redis):
+    await redis_client.set_json("video:1", {"id": 1}, expire=60, tags=["video"])
+    assert 0 < await fake_redis.ttl("tag:video") <= 60
+
+
+@pytest.mark.asyncio
+async def test_tag_set_lives_as_long_as_its_longest_key(fake_redis):
+    await redis_client.set_json("video:1", {"id": 1}, expire=60, tags=["video"])
+    await redis_client.set_json("video:2", {"id": 2}, expire=600, tags=["video"])
+    assert 60 < await fake_redis.ttl("tag:video") <= 600
+
+    # A shorter-lived key does not shorten it again
+    await redis_client.set_json("video:3", {"id": 3}, expire=30, tags=["video"])
+    assert 60 < await fake_redis.ttl("tag:video") <= 600
+
+
+@pytest.mark.asyncio
+async def test_persistent_key_keeps_tag_set_persistent(fake_redis):
+    await redis_client.set_json("video:1", {"id": 1}, expire=60, tags=["video"])
+    await redis_client.set_json("video:2", {"id": 2}, tags=["video"])
+    assert await fake_redis.ttl("tag:video") == -1
+
+    # Later short-lived keys must not give it a TTL back
+    await redis_client.set_json("video:3", {"id": 3}, expire=60, tags=["video"])
+    await redis_client.set_many_json({"video:4": {"id": 4}}, expire=60, tags=["video"])
+    assert await fake_redis.ttl("tag:video") == -1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tags_removes_members_and_sets(fake_redis):
+    await redis_client.set_json("video:1", {"id": 1}, expire=60, tags=["video", "video:1"])
+    await redis_client.set_many_json({"video:2": {"id": 2}, "video:3": {"id": 3}}, expire=60, tags=["video"])
+    await redis_client.set_json("quiz:1", {"id": 1}, expire=60, tags=["quiz"])
+
+    assert await redis_client.invalidate_tags("video") == 3
+
+    assert not await fake_redis.exists("video:1", "video:2", "video:3", "tag:video")
+    assert await fake_redis.exists("quiz:1", "tag:quiz") == 2
+    assert await redis_client.invalidate_tags("video") == 0
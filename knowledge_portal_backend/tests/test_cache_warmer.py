@@ -0,0 +1,27 @@
+import pytest
+
+from app.core.config import settings
+from app.models import Video
+from app.services.base import BaseService
+
+
+class FakeRepository:
+    """Just enough of BaseRepository for BaseService.get()"""
+    model = Video
+
+    async def get(self, id):
+        return None
+
+
+@pytest.mark.asyncio
+async def test_reads_are_recorded_but_warm_loads_are_not(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_WARM_ENABLED", True)
+    monkeypatch.setattr(settings, "CACHE_WARM_GROUPS", ["video"])
+    monkeypatch.setattr(settings, "CACHE_WARM_SAMPLE_RATES", {"video": 1.0})
+    service = BaseService(FakeRepository(), cache_prefix="video")
+
+    await service.get(7, record=False)
+    assert await fake_redis.zscore("cache:popular:video", "7") is None
+
+    await service.get(7)
+    assert await fake_redis.zscore("cache:popular:video", "7") == 1
@@ -0,0 +1,74 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.core.response_cache import cache_key, cached_response
+from app.crud.user import user_crud
+from app.models import User
+
+
+class FakeSession:
+    """Just enough of AsyncSession for CRUDBase.update()"""
+    def add(self, obj):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, obj):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_not_found_response_is_replayed_from_tombstone(fake_redis):
+    calls = []
+
+    @cached_response(cache_key("test_video", "video_id"), soft_ttl=60, hard_ttl=600, db_param=None)
+    async def get_video(video_id: int):
+        calls.append(video_id)
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    for _ in range(3):
+        with pytest.raises(HTTPException) as error:
+            await get_video(video_id=42)
+        assert error.value.status_code == 404
+        assert error.value.detail == "Video not found"
+    assert calls == [42]
+    assert 0 < await fake_redis.ttl("test_video:42") <= settings.NEGATIVE_CACHE_TTL_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_cached(fake_redis):
+    calls = []
+
+    @cached_response(cache_key("test_video", "video_id"), soft_ttl=60, hard_ttl=600, db_param=None)
+    async def get_video(video_id: int):
+        calls.append(video_id)
+        raise HTTPException(status_code=500, detail="Boom")
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await get_video(video_id=42)
+    assert calls == [42, 42]
+    assert not await fake_redis.exists("test_video:42")
+
+
+@pytest.mark.asyncio
+async def test_mark_and_clear_missing(fake_redis):
+    assert not await redis_client.is_known_missing("user:7")
+    await redis_client.mark_missing("user:7")
+    assert await redis_client.is_known_missing("user:7")
+    await redis_client.clear_missing("user:7")
+    assert not await redis_client.is_known_missing("user:7")
+
+
+@pytest.mark.asyncio
+async def test_email_change_clears_tombstone_of_new_address(fake_redis):
+    await redis_client.mark_missing("user:email:new@example.com")
+    user = User(id=1, email="old@example.com", username="someone")
+
+    await user_crud.update(FakeSession(), db_obj=user, obj_in={"email": "new@example.com"})
+
+    assert user.email == "new@example.com"
+    assert not await redis_client.is_known_missing("user:email:new@example.com")
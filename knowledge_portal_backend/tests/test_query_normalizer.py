@@ -0,0 +1,55 @@
+import pytest
+
+from app.api.v1.endpoints.video_content_search import content_search_cache_key
+from app.core.config import settings
+from app.core.query_normalizer import normalize_query
+from app.core.response_cache import popularity_ttl
+from app.schemas.video_content_search import VideoContentSearchQuery
+
+
+@pytest.mark.parametrize("query", [
+    "Python Decorators", "python decorators ", "python  decorators!", " PYTHON\tdecorators?", "python, decorators"
+])
+def test_spelling_variants_collide(query):
+    assert normalize_query(query) == "python decorators"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("C++ vs C#?", "c++ vs c#"),
+    ("Ｐｙｔｈｏｎ", "python"),  # Full-width characters
+    ("Straße", "strasse"),
+    ("café", "café"),  # Accents distinguish words and are kept
+])
+def test_canonical_forms(query, expected):
+    assert normalize_query(query) == expected
+
+
+@pytest.mark.parametrize("first, second", [("c++", "c#"), ("café", "cafe"), ("react hooks", "react hook")])
+def test_different_queries_stay_apart(first, second):
+    assert normalize_query(first) != normalize_query(second)
+
+
+def test_stopwords_are_stripped_only_when_asked():
+    assert normalize_query("What is a decorator") == "what is a decorator"
+    assert normalize_query("What is a decorator", strip_stopwords=True) == "decorator"
+    # A query made only of stopwords is kept rather than emptied
+    assert normalize_query("The Who", strip_stopwords=True) == "the who"
+
+
+def test_variants_share_a_cache_key():
+    keys = {
+        content_search_cache_key(search_query=VideoContentSearchQuery(query=query))
+        for query in ("Python Decorators", "python  decorators!", "PYTHON decorators")
+    }
+    assert len(keys) == 1
+
+
+@pytest.mark.asyncio
+async def test_popular_queries_are_cached_longer(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_WARM_SAMPLE_RATES", {"video_content_search": 1.0})
+    ttl = popularity_ttl(content_search_cache_key, min_ttl=600, max_ttl=86400, hits_for_max=100)
+    # Read counts are kept per normalized query
+    await fake_redis.zadd("cache:popular:video_content_search", {'["python decorators"]': 100})
+
+    assert await ttl(search_query=VideoContentSearchQuery(query="Rust lifetimes")) == 600
+    assert await ttl(search_query=VideoContentSearchQuery(query="Python  Decorators")) > 80000
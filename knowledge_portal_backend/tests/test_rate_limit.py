@@ -0,0 +1,117 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from redis.exceptions import ConnectionError
+
+from app.core.config import settings
+from app.core.rate_limit import RateLimitMiddleware, RateLimitRule, charge
+from app.core.redis_client import redis_client
+from app.core.security import create_access_token
+
+WINDOW_MS = 60000
+RULE = RateLimitRule(name="test", method="POST", path="/limited", limit=2)
+
+
+@pytest.fixture
+def client(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    app = FastAPI()
+
+    @app.post("/limited")
+    async def limited():
+        return {"ok": True}
+
+    @app.post("/open")
+    async def unlimited():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, rules=[RULE])
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_allows_up_to_limit(fake_redis):
+    assert await redis_client.hit_sliding_window("ratelimit:t", 3, WINDOW_MS) == (True, 2, 0)
+    assert await redis_client.hit_sliding_window("ratelimit:t", 3, WINDOW_MS) == (True, 1, 0)
+    assert await redis_client.hit_sliding_window("ratelimit:t", 3, WINDOW_MS) == (True, 0, 0)
+
+    allowed, remaining, retry_after_ms = await redis_client.hit_sliding_window("ratelimit:t", 3, WINDOW_MS)
+    assert (allowed, remaining) == (False, 0)
+    assert 0 < retry_after_ms <= WINDOW_MS
+    # Rejected requests are not recorded
+    assert await fake_redis.zcard("ratelimit:t") == 3
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_charges_cost(fake_redis):
+    assert await redis_client.hit_sliding_window("ratelimit:t", 5, WINDOW_MS, cost=3) == (True, 2, 0)
+    assert await fake_redis.zcard("ratelimit:t") == 3
+
+    allowed, _, retry_after_ms = await redis_client.hit_sliding_window("ratelimit:t", 5, WINDOW_MS, cost=3)
+    assert not allowed
+    assert 0 < retry_after_ms <= WINDOW_MS
+    assert await redis_client.hit_sliding_window("ratelimit:t", 5, WINDOW_MS, cost=2) == (True, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_cost_above_limit_waits_a_full_window(fake_redis):
+    assert await redis_client.hit_sliding_window("ratelimit:t", 2, WINDOW_MS, cost=3) == (False, 0, WINDOW_MS)
+    assert not await fake_redis.exists("ratelimit:t")
+
+
+@pytest.mark.asyncio
+async def test_middleware_rejects_over_limit(client):
+    async with client:
+        for remaining in ("1", "0"):
+            response = await client.post("/limited")
+            assert response.status_code == 200
+            assert response.headers["X-RateLimit-Limit"] == "2"
+            assert response.headers["X-RateLimit-Remaining"] == remaining
+
+        response = await client.post("/limited")
+        assert response.status_code == 429
+        assert 1 <= int(response.headers["Retry-After"]) <= 60
+        assert response.headers["X-RateLimit-Remaining"] == "0"
+
+        # Other routes are not limited
+        response = await client.post("/open")
+        assert response.status_code == 200
+        assert "X-RateLimit-Limit" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_middleware_counts_callers_separately(client):
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': 'alice@example.com'})}"}
+    async with client:
+        for _ in range(2):
+            await client.post("/limited", headers=alice)
+        assert (await client.post("/limited", headers=alice)).status_code == 429
+        # Anonymous requests (and invalid tokens) are counted per IP instead
+        assert (await client.post("/limited")).status_code == 200
+        assert (await client.post("/limited", headers={"Authorization": "Bearer not-a-jwt"})).status_code == 200
+
+    assert await redis_client.redis_client.exists(
+        "ratelimit:test:user:alice@example.com", "ratelimit:test:ip:127.0.0.1"
+    ) == 2
+
+
+@pytest.mark.asyncio
+async def test_middleware_fails_open(client, monkeypatch):
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("Redis went away")
+
+    monkeypatch.setattr(redis_client, "hit_sliding_window", unavailable)
+    async with client:
+        for _ in range(3):
+            response = await client.post("/limited")
+            assert response.status_code == 200
+            assert "X-RateLimit-Remaining" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_charge_returns_seconds_to_wait(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    scope = {"type": "http", "headers": [], "client": ("10.0.0.1", 1234)}
+    assert await charge(scope, RULE, 2) is None
+    assert 1 <= await charge(scope, RULE, 1) <= 60
+    assert await charge(scope, RULE, 0) is None
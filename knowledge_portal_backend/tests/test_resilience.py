@@ -0,0 +1,174 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core import resilience
+from app.core.resilience import (
+    CLOSED, HALF_OPEN, OPEN, AdaptiveConcurrencyLimiter, CircuitBreaker, CircuitOpenError,
+    ConcurrencyLimitError, ResilienceGuard
+)
+from app.core.response_cache import cache_key, cached_response
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    options = dict(
+        window=10, min_calls=4, failure_rate=0.5, slow_call_seconds=2.0, slow_call_rate=0.8,
+        open_seconds=30.0, half_open_calls=2
+    )
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+def call(breaker: CircuitBreaker, success: bool, seconds: float = 0.1):
+    breaker.record(success, seconds, breaker.before_call())
+
+
+def test_opens_on_failure_rate(clock):
+    breaker = make_breaker()
+    for success in (True, False, True):
+        call(breaker, success)
+    assert breaker.state == CLOSED  # Too few calls to judge
+    call(breaker, False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == pytest.approx(30.0)
+
+
+def test_opens_on_slow_calls(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        call(breaker, True, seconds=5.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_probes_close_the_breaker(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        call(breaker, False)
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+
+    first, second = breaker.before_call(), breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # Only half_open_calls probes at a time
+    breaker.record(True, 0.1, first)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True, 0.1, second)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["calls"] == 0
+
+
+def test_failed_probe_reopens(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        call(breaker, False)
+    clock.now += 30
+    call(breaker, False)
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == pytest.approx(30.0)
+
+
+def test_late_result_is_not_a_probe(clock):
+    breaker = make_breaker(half_open_calls=1)
+    late = breaker.before_call()
+    for _ in range(4):
+        call(breaker, False)
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+
+    # Admitted while closed, finished after the breaker went half-open
+    breaker.record(True, 0.1, late)
+    assert breaker.state == HALF_OPEN
+    call(breaker, True)
+    assert breaker.state == CLOSED
+
+
+def test_limiter_increases_additively_and_backs_off():
+    limiter = AdaptiveConcurrencyLimiter("test", initial=4, minimum=1, maximum=5, slow_call_seconds=2.0)
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(True, 0.1)
+    assert 4.9 < limiter.limit <= 5  # About +1 per limit's worth of fast successes
+
+    before = limiter.limit
+    limiter.acquire()
+    limiter.release(False, 0.1)
+    assert limiter.limit == pytest.approx(before * 0.5)
+    before = limiter.limit
+    limiter.acquire()
+    limiter.release(True, 3.0)  # Slow successes back off too
+    assert limiter.limit == pytest.approx(before * 0.5)
+
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(False, 0.1)
+    assert limiter.limit == limiter.minimum
+    assert limiter.in_flight == 0
+
+
+def test_limiter_rejects_beyond_limit():
+    limiter = AdaptiveConcurrencyLimiter("test", initial=2, minimum=1, maximum=5, slow_call_seconds=2.0)
+    limiter.acquire()
+    limiter.acquire()
+    with pytest.raises(ConcurrencyLimitError):
+        limiter.acquire()
+
+
+@pytest.mark.asyncio
+async def test_guard_counts_failures_and_frees_slots(clock):
+    guard = ResilienceGuard(
+        make_breaker(min_calls=2),
+        AdaptiveConcurrencyLimiter("test", initial=4, minimum=1, maximum=8, slow_call_seconds=2.0)
+    )
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            async with guard.call():
+                raise RuntimeError("retriever down")
+    assert guard.breaker.state == OPEN
+    assert guard.limiter.in_flight == 0
+    assert guard.limiter.limit == 1.0
+    with pytest.raises(CircuitOpenError):
+        async with guard.call():
+            pass
+
+
+@pytest.mark.asyncio
+async def test_stale_response_is_served_on_503(fake_redis):
+    calls = []
+    failing = False
+
+    @cached_response(
+        cache_key("test_search", "query"), soft_ttl=60, hard_ttl=600, db_param=None, serve_stale_for=3600
+    )
+    async def search(query: str):
+        calls.append(query)
+        if failing:
+            raise HTTPException(status_code=503, detail="Retriever unavailable")
+        return {"results": [query]}
+
+    assert await search(query="python") == {"results": ["python"]}
+    await fake_redis.delete("test_search:python")  # The fresh entry expired
+    failing = True
+
+    assert await search(query="python") == {"results": ["python"]}
+    assert calls == ["python", "python"]
+    assert await fake_redis.ttl("stale:test_search:python") > 600
+
+    with pytest.raises(HTTPException) as error:
+        await search(query="java")  # Nothing stale to fall back on
+    assert error.value.status_code == 503
@@ -0,0 +1,42 @@
+import pytest
+from redis.exceptions import ConnectionError
+
+from app.core.redis_client import redis_client
+from app.core.response_cache import cache_key, cached_response
+
+
+@pytest.mark.asyncio
+async def test_failed_cache_write_does_not_rerun_endpoint(fake_redis, monkeypatch):
+    calls = []
+
+    @cached_response(cache_key("test_search", "query"), soft_ttl=60, hard_ttl=600, db_param=None, serve_stale_for=60)
+    async def search(query: str):
+        calls.append(query)
+        return {"results": [query]}
+
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("Redis went away")
+
+    monkeypatch.setattr(redis_client, "set_json", unavailable)
+    monkeypatch.setattr(redis_client, "release_lock", unavailable)
+
+    assert await search(query="python") == {"results": ["python"]}
+    assert calls == ["python"]
+
+
+@pytest.mark.asyncio
+async def test_unavailable_cache_falls_back_to_endpoint(fake_redis, monkeypatch):
+    calls = []
+
+    @cached_response(cache_key("test_search", "query"), soft_ttl=60, hard_ttl=600, db_param=None)
+    async def search(query: str):
+        calls.append(query)
+        return {"results": [query]}
+
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("Redis went away")
+
+    monkeypatch.setattr(redis_client, "get_json_with_ttl", unavailable)
+
+    assert await search(query="python") == {"results": ["python"]}
+    assert calls == ["python"]
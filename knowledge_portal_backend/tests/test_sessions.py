@@ -0,0 +1,61 @@
+import pytest
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+
+SESSION_TTL = settings.SESSION_EXPIRE_MINUTES * 60
+
+
+@pytest.mark.asyncio
+async def test_create_and_read_session(fake_redis):
+    session_id = await redis_client.create_session(7, {"role": "admin", "interests": ["python", "sql"]})
+
+    assert await redis_client.get_session(session_id) == {
+        "user_id": 7, "role": "admin", "interests": ["python", "sql"]
+    }
+    assert await redis_client.get_session_fields(session_id, "role", "theme") == {"role": "admin", "theme": None}
+    assert 0 < await fake_redis.ttl(f"session:{session_id}") <= SESSION_TTL
+
+
+@pytest.mark.asyncio
+async def test_partial_update_keeps_other_fields(fake_redis):
+    session_id = await redis_client.create_session(7, {"role": "admin", "theme": "dark"})
+
+    assert await redis_client.update_session(session_id, {"theme": "light", "last_path": 3})
+
+    assert await redis_client.get_session(session_id) == {
+        "user_id": 7, "role": "admin", "theme": "light", "last_path": 3
+    }
+
+
+@pytest.mark.asyncio
+async def test_update_of_missing_session_does_not_recreate_it(fake_redis):
+    assert not await redis_client.update_session("gone", {"theme": "light"})
+    assert not await redis_client.update_session("gone", {})
+    assert not await fake_redis.exists("session:gone")
+    assert await redis_client.get_session("gone") is None
+    assert await redis_client.get_session_fields("gone", "theme") is None
+
+
+@pytest.mark.asyncio
+async def test_reads_and_updates_slide_the_ttl(fake_redis):
+    session_id = await redis_client.create_session(7, {"role": "admin"})
+    key = f"session:{session_id}"
+
+    for refresh in (
+        lambda: redis_client.get_session(session_id),
+        lambda: redis_client.get_session_fields(session_id, "role"),
+        lambda: redis_client.update_session(session_id, {"theme": "dark"}),
+        lambda: redis_client.touch_session(session_id),
+    ):
+        await fake_redis.expire(key, 5)
+        await refresh()
+        assert await fake_redis.ttl(key) > SESSION_TTL - 5
+
+
+@pytest.mark.asyncio
+async def test_delete_session(fake_redis):
+    session_id = await redis_client.create_session(7, {})
+    assert await redis_client.delete_session(session_id)
+    assert await redis_client.get_session(session_id) is None
+    assert not await redis_client.touch_session(session_id)
@@ -0,0 +1,97 @@
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.api.v1.endpoints.video_search import (
+    TIER_EXACT, VideoSearchFilters, VideoSearchQuery, decode_cursor, encode_cursor
+)
+
+
+def with_cursor(search_query: VideoSearchQuery, cursor: str) -> VideoSearchQuery:
+    return search_query.model_copy(update={"cursor": cursor})
+
+
+def test_round_trip():
+    search_query = VideoSearchQuery(query="python", per_page=5)
+    cursor = encode_cursor(search_query, [1.5, "42"], "pit-id", TIER_EXACT)
+    payload = decode_cursor(with_cursor(search_query, cursor))
+    assert payload["n"] == 5
+    assert payload["after"] == [1.5, "42"]
+    assert payload["pit"] == "pit-id"
+    assert payload["tier"] == TIER_EXACT
+
+
+def test_rejects_cursor_from_another_query():
+    cursor = encode_cursor(VideoSearchQuery(query="python"), [1.5, "42"], None, TIER_EXACT)
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(VideoSearchQuery(query="java", cursor=cursor))
+    assert error.value.status_code == 400
+
+
+def test_rejects_cursor_from_other_filters():
+    search_query = VideoSearchQuery(query="python")
+    cursor = encode_cursor(search_query, [1.5, "42"], None, TIER_EXACT)
+    filtered = VideoSearchQuery(query="python", filters=VideoSearchFilters(category=["web"]), cursor=cursor)
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(filtered)
+    assert error.value.status_code == 400
+
+
+def test_rejects_tampered_payload():
+    search_query = VideoSearchQuery(query="python")
+    cursor = encode_cursor(search_query, [1.5, "42"], "pit-id", TIER_EXACT)
+    encoded, _, signature = cursor.partition(".")
+    payload = json.loads(base64.urlsafe_b64decode(encoded))
+    payload["pit"] = "someone-elses-pit"
+    forged = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(with_cursor(search_query, f"{forged}.{signature}"))
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["", "garbage", "not base64.sig", "é.é"])
+def test_rejects_malformed_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(VideoSearchQuery(query="python", cursor=cursor))
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("per_page", [0, -1, 1000])
+def test_per_page_is_bounded(per_page):
+    with pytest.raises(ValidationError):
+        VideoSearchQuery(query="python", per_page=per_page)
+
+
+@pytest.mark.asyncio
+async def test_search_works_while_redis_is_down(fake_redis, monkeypatch):
+    from redis.exceptions import ConnectionError
+
+    from app.api.v1.endpoints import video_search
+    from app.core.elasticsearch_client import es_client
+    from app.core.redis_client import redis_client
+
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("Redis went away")
+
+    async def tiered_search(search_query, build_body, **projection):
+        hit = {"_id": "1", "_source": {
+            "title": "Python", "description": "", "url": "https://example.com", "duration": 60,
+            "category": "web", "difficulty_level": "beginner", "tags": [], "skills": []
+        }}
+        return TIER_EXACT, {
+            "hits": {"hits": [hit]},
+            "aggregations": {"category": {"buckets": [{"key": "web", "doc_count": 1}]}}
+        }
+
+    monkeypatch.setattr(redis_client, "get_json_with_ttl", unavailable)
+    monkeypatch.setattr(redis_client, "set_json", unavailable)
+    monkeypatch.setattr(fake_redis, "exists", unavailable)
+    monkeypatch.setattr(es_client, "es_client", object())
+    monkeypatch.setattr(video_search, "tiered_search", tiered_search)
+
+    page = await video_search.search_videos(VideoSearchQuery(query="python", include_facets=True))
+    assert [video.id for video in page.results] == ["1"]
+    assert page.facets["category"][0].value == "web"
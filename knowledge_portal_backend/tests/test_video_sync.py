@@ -0,0 +1,23 @@
+import pytest
+
+from app.core.elasticsearch_client import es_client
+from app.services.video_sync import PENDING_KEY, video_sync_consumer
+
+
+class FailingIndices:
+    async def exists_alias(self, name):
+        raise ConnectionError("Elasticsearch is down")
+
+
+class FakeElasticsearch:
+    indices = FailingIndices()
+
+
+@pytest.mark.asyncio
+async def test_batch_is_requeued_when_the_alias_check_fails(fake_redis, monkeypatch):
+    monkeypatch.setattr(es_client, "es_client", FakeElasticsearch())
+    await fake_redis.sadd(PENDING_KEY, "video:1", "tag:2")
+
+    with pytest.raises(ConnectionError):
+        await video_sync_consumer.apply_pending()
+    assert await fake_redis.smembers(PENDING_KEY) == {b"video:1", b"tag:2"}
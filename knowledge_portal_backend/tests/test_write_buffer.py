@@ -0,0 +1,58 @@
+import pytest
+
+from app.core.config import settings
+from app.core.elasticsearch_client import BulkWriteBuffer
+
+
+class FakeElasticsearch:
+    def __init__(self):
+        self.requests = []
+        self.fail = False
+
+    async def bulk(self, operations, refresh):
+        if self.fail:
+            raise ConnectionError("Elasticsearch is down")
+        self.requests.append(operations)
+        items = [{next(iter(line)): {"status": 200}} for line in operations if "index" in line or "delete" in line]
+        return {"errors": False, "items": items}
+
+
+class FakeClient:
+    def __init__(self):
+        self.es_client = FakeElasticsearch()
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_is_sent_as_one_bulk_request(monkeypatch):
+    monkeypatch.setattr(settings, "ELASTICSEARCH_WRITE_BUFFER_SIZE", 2)
+    client = FakeClient()
+    buffer = BulkWriteBuffer(client)
+
+    await buffer.index("videos", {"title": "Python"}, doc_id="1")
+    assert client.es_client.requests == []
+    await buffer.delete("videos", "2")
+    assert client.es_client.requests == [[
+        {"index": {"_index": "videos", "_id": "1"}},
+        {"title": "Python"},
+        {"delete": {"_index": "videos", "_id": "2"}}
+    ]]
+    assert len(buffer) == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_newest_operations_up_to_max_size(monkeypatch):
+    monkeypatch.setattr(settings, "ELASTICSEARCH_WRITE_BUFFER_SIZE", 2)
+    monkeypatch.setattr(settings, "ELASTICSEARCH_WRITE_BUFFER_MAX_SIZE", 3)
+    client = FakeClient()
+    client.es_client.fail = True
+    buffer = BulkWriteBuffer(client)
+
+    # Neither the failed flushes nor the overflow escape to the writer
+    for doc_id in ["1", "2", "3", "4", "5"]:
+        await buffer.delete("videos", doc_id)
+    assert len(buffer) == 3
+
+    client.es_client.fail = False
+    await buffer.close()
+    assert client.es_client.requests == [[{"delete": {"_index": "videos", "_id": doc_id}} for doc_id in ["3", "4", "5"]]]
+    assert len(buffer) == 0